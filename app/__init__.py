@@ -16,7 +16,19 @@ metadata = MetaData(
     }
 )
 db = SQLAlchemy(app, metadata=metadata)
-migrate = Migrate(app, db)
+
+
+def include_object(object, name, type_, reflected, compare_to):
+    # Full-text search objects are managed by hand in migrations, keep
+    # autogenerate from dropping them (see app/search.py).
+    return not (
+        reflected
+        and compare_to is None
+        and name.startswith(("movies_fts", "search_vector", "ix_movies_search_vector"))
+    )
+
+
+migrate = Migrate(app, db, include_object=include_object)
 
 bcrypt = Bcrypt(app)
 
@@ -40,8 +52,12 @@ CORS(
                 "Content-Type",
                 "Authorization",
             ],
+            "expose_headers": [
+                "Link",
+                "X-Next-Cursor",
+            ],
         }
     },
 )
 
-from app import models, routes
+from app import models, routes, commands
@@ -0,0 +1,56 @@
+from collections import namedtuple
+
+from flask import g, session
+from werkzeug.local import LocalProxy
+
+from app import app, db
+from app.cache import MemoryCache, NullCache, cache
+from app.models import User
+
+# The signed-in user, resolved at most once per request.
+#
+# ``current_user`` is the Identity of session["user_id"] (or None), looked up
+# on first access and kept on flask.g for the rest of the request. With a
+# shared (redis) response cache, identities are also kept in-process for
+# IDENTITY_CACHE_TTL seconds, keyed by the user's cache version, so a write to
+# that user in any process is seen by the next request even within the TTL.
+# Per-process or disabled caches can't see every write, so a demoted or
+# deleted user would keep their rights; those resolve once per request.
+
+Identity = namedtuple("Identity", "id username type")
+
+ttl = app.config.get("IDENTITY_CACHE_TTL", 30)
+if ttl > 0 and cache.shared:
+    identities = MemoryCache(ttl=ttl, max_entries=4096)
+else:
+    identities = NullCache()
+
+
+def load_identity(user_id):
+    if not user_id:
+        return None
+    key = None
+    if identities.enabled:
+        (version,) = cache.versions([f"user:{user_id}"])
+        key = f"{user_id}:{version}"
+    identity = identities.get(key)
+    if identity is None:
+        row = (
+            db.session.query(User.id, User.username, User.type)
+            .filter(User.id == user_id)
+            .first()
+        )
+        if row is None:
+            return None
+        identity = Identity(*row)
+        identities.set(key, identity)
+    return identity
+
+
+def _current_user():
+    if "current_user" not in g:
+        g.current_user = load_identity(session.get("user_id"))
+    return g.current_user
+
+
+current_user = LocalProxy(_current_user)
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+
+# Standard library imports
+import sys
+from timeit import repeat
+
+# Local imports
+from app import app
+from app.models import Movie, User, Review, CartItem
+from app.projections import PROJECTIONS
+from app.serializers import serializer
+
+# Compares SerializerMixin.to_dict against the compiled serializers on an
+# in-memory catalog, using the rules of the list endpoints' detail view.
+#
+#   python -m app.benchmark [movies]
+
+MOVIE_RULES = PROJECTIONS[Movie]["detail"].rules
+REVIEW_RULES = PROJECTIONS[Review]["detail"].rules
+CART_ITEM_RULES = PROJECTIONS[CartItem]["detail"].rules
+
+
+def build_catalog(size):
+    users = [
+        User(id=i, username=f"user{i}", password_hash="x", type="customer")
+        for i in range(1, 51)
+    ]
+    movies, reviews, cart_items = [], [], []
+    for i in range(1, size + 1):
+        movie = Movie(
+            id=i,
+            name=f"Movie {i}",
+            image=f"https://example.com/{i}.jpg",
+            year=1950 + i % 70,
+            director=f"Director {i % 300}",
+            description="A description long enough to look like a real synopsis. " * 4,
+            price=9.99 + i % 10,
+        )
+        for j in range(3):
+            user = users[(i + j) % len(users)]
+            reviews.append(
+                Review(
+                    id=len(reviews) + 1,
+                    rating=1 + (i + j) % 10,
+                    text="Great movie!",
+                    movie=movie,
+                    user=user,
+                )
+            )
+        for j in range(2):
+            user = users[(i * 7 + j) % len(users)]
+            cart_items.append(
+                CartItem(id=len(cart_items) + 1, movie_cart=movie, user_cart=user)
+            )
+        movies.append(movie)
+    return movies, reviews, cart_items
+
+
+def bench(label, model, rows, rules):
+    dump = serializer(model, rules)
+    assert [dump(row) for row in rows] == [row.to_dict(rules=rules) for row in rows]
+
+    mixin = min(
+        repeat(lambda: [row.to_dict(rules=rules) for row in rows], number=1, repeat=3)
+    )
+    compiled = min(repeat(lambda: [dump(row) for row in rows], number=1, repeat=3))
+    per_row = 1_000_000 / len(rows)
+    print(
+        f"{label:<10} rows={len(rows):<7} "
+        f"to_dict={mixin * per_row:8.1f}us/row  "
+        f"compiled={compiled * per_row:7.1f}us/row  "
+        f"speedup={mixin / compiled:5.1f}x"
+    )
+
+
+if __name__ == "__main__":
+
+    with app.app_context():
+        size = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+        movies, reviews, cart_items = build_catalog(size)
+
+        print("Benchmarking serializers...")
+        bench("Movie", Movie, movies, MOVIE_RULES)
+        bench("Review", Review, reviews, REVIEW_RULES)
+        bench("CartItem", CartItem, cart_items, CART_ITEM_RULES)
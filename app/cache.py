@@ -0,0 +1,348 @@
+import hashlib
+import json
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from functools import wraps
+
+from flask import g, make_response, request, session
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from app import app
+
+# Response cache and conditional GET support.
+#
+# Entries are keyed by route, query string and the current version of every
+# table the response is built from. Committed writes bump those versions (see
+# the session hooks below), so stale entries are simply never looked up again
+# and age out of the backend. The same versions give every response an ETag
+# that can be checked without touching the database.
+
+
+class NullCache:
+    enabled = False
+    shared = False
+
+    def get(self, key):
+        return None
+
+    def set(self, key, value, ttl=None, size=None):
+        pass
+
+    def delete(self, key):
+        pass
+
+    def versions(self, names):
+        return [0 for _ in names]
+
+    def bump(self, names):
+        pass
+
+    def stamp(self, names):
+        return None
+
+
+class MemoryCache:
+    # Per-process TTL + LRU store, bounded by entry count and, with
+    # ``max_bytes``, by the approximate size of the values. Versions are per
+    # process too, so a write handled by another process isn't seen here
+    # until the TTL runs out: only use it with a single process.
+    enabled = True
+    shared = False
+
+    def __init__(self, ttl=60, max_entries=1024, max_bytes=None):
+        if ttl <= 0:
+            raise ValueError("MemoryCache needs a positive ttl.")
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._bytes = 0
+        self._entries = OrderedDict()
+        self._versions = {}
+        self._lock = threading.Lock()
+        self._boot = uuid.uuid4().hex[:8]
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, value, size = entry
+            if expires < time.monotonic():
+                del self._entries[key]
+                self._bytes -= size
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None, size=None):
+        expires = time.monotonic() + (ttl or self.ttl)
+        if self.max_bytes is None:
+            size = 0
+        elif size is None:
+            size = len(json.dumps(value, default=str))
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[2]
+            if self.max_bytes is not None and size > self.max_bytes:
+                return
+            self._entries[key] = (expires, value, size)
+            self._bytes += size
+            # Entries of old versions are never read again and go first.
+            while len(self._entries) > self.max_entries or (
+                self.max_bytes is not None and self._bytes > self.max_bytes
+            ):
+                _, (_, _, evicted) = self._entries.popitem(last=False)
+                self._bytes -= evicted
+
+    def delete(self, key):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._bytes -= entry[2]
+
+    def versions(self, names):
+        with self._lock:
+            return [self._versions.get(name, 0) for name in names]
+
+    def bump(self, names):
+        with self._lock:
+            for name in names:
+                self._versions[name] = self._versions.get(name, 0) + 1
+
+    def stamp(self, names):
+        # Versions restart with the process and don't see other processes'
+        # writes, so stamps also change on restart and every ttl seconds.
+        bucket = int(time.time() // self.ttl)
+        versions = ",".join(map(str, self.versions(names)))
+        return f"{self._boot}.{bucket}:{versions}"
+
+
+class RedisCache:
+    # Any Redis-compatible server (Redis, Valkey, KeyDB, ...). Needs the
+    # optional ``redis`` package.
+    enabled = True
+    shared = True
+
+    def __init__(self, url, ttl=60, prefix="webflix:"):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("CACHE_BACKEND=redis requires the redis package.")
+        self.client = redis.Redis.from_url(url)
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def get(self, key):
+        value = self.client.get(self.prefix + key)
+        return None if value is None else json.loads(value)
+
+    def set(self, key, value, ttl=None, size=None):
+        self.client.set(self.prefix + key, json.dumps(value), ex=ttl or self.ttl)
+
+    def delete(self, key):
+        self.client.delete(self.prefix + key)
+
+    def versions(self, names):
+        values = self.client.mget([f"{self.prefix}version:{name}" for name in names])
+        return [int(value or 0) for value in values]
+
+    def bump(self, names):
+        pipe = self.client.pipeline()
+        for name in names:
+            pipe.incr(f"{self.prefix}version:{name}")
+        pipe.execute()
+
+    def stamp(self, names):
+        # The epoch changes whenever the server loses its keys, so versions
+        # restarting at 0 can't revive old ETags.
+        epoch_key = f"{self.prefix}epoch"
+        epoch, *versions = self.client.mget(
+            [epoch_key] + [f"{self.prefix}version:{name}" for name in names]
+        )
+        if epoch is None:
+            self.client.set(epoch_key, uuid.uuid4().hex[:8], nx=True)
+            epoch = self.client.get(epoch_key)
+        versions = ",".join(str(int(value or 0)) for value in versions)
+        return f"{epoch.decode()}:{versions}"
+
+
+def make_cache(config):
+    backend = config.get("CACHE_BACKEND", "null")
+    ttl = config.get("CACHE_TTL", 60)
+    if ttl <= 0:
+        return NullCache()
+    if backend == "memory":
+        return MemoryCache(
+            ttl=ttl,
+            max_entries=config.get("CACHE_MAX_ENTRIES", 1024),
+            max_bytes=config.get("CACHE_MAX_BYTES", 64 << 20),
+        )
+    if backend == "redis":
+        return RedisCache(config["CACHE_REDIS_URL"], ttl=ttl)
+    return NullCache()
+
+
+cache = make_cache(app.config)
+
+# Responses larger than this are served but not cached.
+MAX_ENTRY_BYTES = app.config.get("CACHE_MAX_ENTRY_BYTES", 1 << 20)
+
+
+# ------------------------------------------------------------------------
+# Write tracking: collect the tables touched by a session, plus "user:<id>"
+# for writes to a user's own row, reviews or cart, and bump their versions
+# once the transaction commits.
+
+
+def _changed(session):
+    return session.info.setdefault("changed_tables", set())
+
+
+def mark_changed(session, *names):
+    # For writes the hooks below can't see: raw DBAPI cursors, COPY, or
+    # multi-row statements that touch specific users.
+    _changed(session).update(names)
+
+
+def _owners(obj):
+    if obj.__table__.name == "users":
+        return [obj.id]
+    if "user_id" not in obj.__table__.c:
+        return []
+    history = inspect(obj).attrs.user_id.history
+    return [obj.user_id, *history.deleted]
+
+
+def _track(changed, obj):
+    changed.add(obj.__table__.name)
+    changed.update(f"user:{user_id}" for user_id in _owners(obj) if user_id)
+
+
+@event.listens_for(Session, "after_flush")
+def _track_flush(session, flush_context):
+    changed = _changed(session)
+    for obj in session.new | session.deleted:
+        _track(changed, obj)
+    for obj in session.dirty:
+        if session.is_modified(obj, include_collections=False):
+            _track(changed, obj)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _track_statement(orm_execute_state):
+    state = orm_execute_state
+    if state.is_insert or state.is_update or state.is_delete:
+        _changed(state.session).add(state.statement.table.name)
+
+
+@event.listens_for(Session, "after_commit")
+def _bump_versions(session):
+    changed = session.info.pop("changed_tables", None)
+    if changed:
+        cache.bump(sorted(changed))
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changes(session):
+    session.info.pop("changed_tables", None)
+
+
+# ------------------------------------------------------------------------
+
+
+def request_key(tables, per_user=False):
+    # Identifies this GET and the data it would be built from; computed at
+    # most once per request.
+    cached_key = g.get("request_key")
+    if cached_key is not None:
+        return cached_key
+
+    if callable(tables):
+        tables = tables()
+    user = session.get("user_id") if per_user else None
+    names = list(tables) + ([f"user:{user}"] if user else [])
+    stamp = cache.stamp(names)
+    if stamp is None:
+        return None
+    args = sorted(request.args.items(multi=True))
+    key = f"{request.path}?{args}:{user}:{','.join(names)}={stamp}"
+    g.request_key = key
+    return key
+
+
+def conditional(*tables, per_user=False):
+    # ETag / If-None-Match for a GET handler that reads ``tables``. A match is
+    # answered with 304 before the handler (and its queries) run. ``tables``
+    # may also be one callable that returns them for the current request.
+    if len(tables) == 1 and callable(tables[0]):
+        tables = tables[0]
+
+    def decorator(method):
+        @wraps(method)
+        def wrapper(*args, **kwargs):
+            key = request_key(tables, per_user)
+            if key is None:
+                return method(*args, **kwargs)
+
+            tag = hashlib.blake2b(key.encode("utf-8"), digest_size=16).hexdigest()
+            if request.if_none_match.contains(tag):
+                response = make_response("", 304)
+            else:
+                response = method(*args, **kwargs)
+                if response.status_code != 200:
+                    return response
+            response.set_etag(tag)
+            if per_user:
+                response.vary.add("Cookie")
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+def cached(*tables, per_user=False):
+    # Caches successful responses of a GET handler that reads ``tables``, and
+    # answers conditional requests for it.
+    def decorator(method):
+        @wraps(method)
+        def wrapper(*args, **kwargs):
+            key = request_key(tables, per_user)
+            if key is None:
+                return method(*args, **kwargs)
+
+            key = f"response:{key}"
+            hit = cache.get(key)
+            if hit is not None:
+                response = make_response(hit["body"], hit["status"], hit["headers"])
+                response.headers["X-Cache"] = "HIT"
+                return response
+
+            response = method(*args, **kwargs)
+            if response.status_code != 200 or response.is_streamed:
+                return response
+            body = response.get_data(as_text=True)
+            if len(body) <= MAX_ENTRY_BYTES:
+                cache.set(
+                    key,
+                    {
+                        "status": response.status_code,
+                        "headers": [
+                            (name, value)
+                            for name, value in response.headers.items()
+                            if name not in ("Content-Length", "Set-Cookie")
+                        ],
+                        "body": body,
+                    },
+                    size=len(body),
+                )
+                response.headers["X-Cache"] = "MISS"
+            return response
+
+        return conditional(*tables, per_user=per_user)(wrapper)
+
+    return decorator
@@ -0,0 +1,219 @@
+import atexit
+import threading
+
+from flask import request, session
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+
+from app import app, db
+from app.auth import current_user
+from app.carts import CartError, add_many, remove_many, validate_line
+from app.models import Movie
+
+# Write-behind cart buffer (CART_WRITE_BEHIND=1).
+#
+# POST /cart_items and DELETE /cart_items/<id> are acknowledged from an
+# in-process, per-user map of pending changes instead of committing one row
+# each. Changes to the same line are coalesced as they arrive: adds sum up, a
+# removal drops whatever was pending for the line, and an add after a removal
+# recreates it. The buffer is written with one remove_many and one add_many
+# per user, in a single commit, every CART_FLUSH_INTERVAL seconds, as soon as
+# CART_FLUSH_SIZE lines are pending, and at exit.
+#
+# A user always reads their own writes: their pending lines are flushed before
+# any GET they make (everyone's, for admins), before a batch change and before
+# Login builds their profile. Other readers see a change at most
+# CART_FLUSH_INTERVAL seconds late. Pending changes live in one process and
+# are lost if it is killed without a graceful shutdown; a flush that fails
+# because the database is locked or unreachable puts them back.
+
+
+class CartBuffer:
+    def __init__(self, interval=1.0, max_lines=500):
+        self.interval = interval
+        self.max_lines = max_lines
+        # {user_id: {movie_id: [clear, quantity]}}: delete the line first if
+        # clear, then add quantity.
+        self._pending = {}
+        self._size = 0
+        # Users whose lines have been taken by a flush that hasn't committed
+        # yet; their reads still have to wait for it.
+        self._in_flight = set()
+        self._lock = threading.Lock()
+        # Flushes run one at a time, so a read that waits for one sees every
+        # change taken before it.
+        self._flushing = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def _line(self, user_id, movie_id):
+        lines = self._pending.setdefault(user_id, {})
+        line = lines.get(movie_id)
+        if line is None:
+            line = lines[movie_id] = [False, 0]
+            self._size += 1
+        return line
+
+    def add(self, user_id, movie_id, quantity=1):
+        # Only acknowledge lines that can be written: one primary key lookup.
+        validate_line(user_id, movie_id, quantity)
+        if db.session.get(Movie, movie_id) is None:
+            raise CartError(f"Movie {movie_id} not found.")
+        with self._lock:
+            self._line(user_id, movie_id)[1] += quantity
+            full = self._size >= self.max_lines
+        self._started(full)
+
+    def remove(self, user_id, movie_id):
+        with self._lock:
+            self._line(user_id, movie_id)[:] = [True, 0]
+            full = self._size >= self.max_lines
+        self._started(full)
+
+    def _started(self, full):
+        # The flusher starts with the first change, so each worker process
+        # forked from a preloaded app gets its own.
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, daemon=True)
+                    self._thread.start()
+        if full:
+            self._wake.set()
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            try:
+                with app.app_context():
+                    self.flush()
+            except Exception:
+                app.logger.exception("Flushing buffered cart changes failed.")
+
+    def has_pending(self, user_id=None):
+        if user_id is None:
+            return bool(self._pending or self._in_flight)
+        return user_id in self._pending or user_id in self._in_flight
+
+    def _take(self, user_ids):
+        with self._lock:
+            if user_ids is None:
+                taken, self._pending = self._pending, {}
+            else:
+                taken = {
+                    user_id: self._pending.pop(user_id)
+                    for user_id in user_ids
+                    if user_id in self._pending
+                }
+            self._size -= sum(len(lines) for lines in taken.values())
+            self._in_flight.update(taken)
+        return taken
+
+    def _write(self, taken):
+        for user_id, lines in taken.items():
+            removed = [movie_id for movie_id, (clear, _) in lines.items() if clear]
+            added = {
+                movie_id: quantity
+                for movie_id, (_, quantity) in lines.items()
+                if quantity
+            }
+            if removed:
+                remove_many(user_id, removed)
+            if added:
+                _, missing = add_many(user_id, added)
+                if missing:
+                    # Deleted after the add was acknowledged.
+                    app.logger.warning(
+                        "Dropped buffered cart lines of user %s for missing movies %s.",
+                        user_id,
+                        missing,
+                    )
+
+    def flush(self, user_ids=None):
+        # Writes the pending changes of ``user_ids`` (everyone by default).
+        # Needs an app context; commits db.session.
+        with self._flushing:
+            taken = self._take(user_ids)
+            if not taken:
+                return 0
+            try:
+                try:
+                    self._write(taken)
+                    db.session.commit()
+                except SQLAlchemyError:
+                    db.session.rollback()
+                    self._retry(taken)
+            finally:
+                with self._lock:
+                    self._in_flight.difference_update(taken)
+            return len(taken)
+
+    def _retry(self, taken):
+        # User by user, so one bad cart doesn't cost everyone else's changes.
+        for user_id, lines in taken.items():
+            try:
+                self._write({user_id: lines})
+                db.session.commit()
+            except IntegrityError:
+                # The user was deleted in the meantime; retrying can't help.
+                db.session.rollback()
+                app.logger.exception(
+                    "Dropped buffered cart changes of user %s.", user_id
+                )
+            except SQLAlchemyError:
+                # Locked or unreachable database: keep the changes, they were
+                # acknowledged, and try again with the next flush.
+                db.session.rollback()
+                self._restore(user_id, lines)
+                app.logger.exception(
+                    "Requeued buffered cart changes of user %s.", user_id
+                )
+
+    def _restore(self, user_id, lines):
+        # Puts taken lines back in front of whatever arrived since.
+        with self._lock:
+            current = self._pending.setdefault(user_id, {})
+            for movie_id, (clear, quantity) in lines.items():
+                newer = current.get(movie_id)
+                if newer is None:
+                    current[movie_id] = [clear, quantity]
+                    self._size += 1
+                elif not newer[0]:
+                    newer[:] = [clear, quantity + newer[1]]
+
+
+def make_buffer(config):
+    if not config.get("CART_WRITE_BEHIND", False):
+        return None
+    return CartBuffer(
+        interval=config.get("CART_FLUSH_INTERVAL", 1.0),
+        max_lines=config.get("CART_FLUSH_SIZE", 500),
+    )
+
+
+cart_buffer = make_buffer(app.config)
+
+if cart_buffer is not None:
+
+    @atexit.register
+    def _flush_carts():
+        with app.app_context():
+            cart_buffer.flush()
+
+    @app.before_request
+    def _read_your_writes():
+        if request.method != "GET" or not cart_buffer.has_pending():
+            return
+        user_id = session.get("user_id")
+        if user_id and cart_buffer.has_pending(user_id):
+            cart_buffer.flush([user_id])
+        if current_user and current_user.type == "admin":
+            cart_buffer.flush()
+
+
+def flush_cart(user_id=None):
+    # Call before reading or checking out a cart; a no-op unless
+    # CART_WRITE_BEHIND is on.
+    if cart_buffer is None:
+        return
+    cart_buffer.flush(None if user_id is None else [user_id])
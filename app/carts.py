@@ -0,0 +1,152 @@
+from collections import Counter
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects import postgresql, sqlite
+
+from app import db
+from app.cache import mark_changed
+from app.loading import eager
+from app.models import CartItem, Movie
+
+# Cart writes and queries.
+#
+# A cart holds one line per (user_id, movie_id), enforced by
+# uq_cart_items_user_id_movie_id; adding a movie that is already in the cart
+# raises that line's quantity in the same INSERT ... ON CONFLICT statement.
+# Batches of movie ids are applied with one multi-row statement each.
+
+MAX_BATCH_SIZE = 500
+
+
+class CartError(ValueError):
+    pass
+
+
+def _insert():
+    dialect = db.session.get_bind().dialect.name
+    if dialect == "postgresql":
+        return postgresql.insert
+    if dialect == "sqlite":
+        return sqlite.insert
+    raise CartError(f"Cart upserts are not supported on {dialect}.")
+
+
+def validate_line(user_id, movie_id, quantity):
+    for key, value in (("user_id", user_id), ("movie_id", movie_id)):
+        if not isinstance(value, int):
+            raise CartError(f"{key} must be an Integer.")
+    if isinstance(quantity, bool) or not isinstance(quantity, int) or quantity < 1:
+        raise CartError("quantity must be a positive integer.")
+
+
+def add_to_cart(user_id, movie_id, quantity=1):
+    # Returns the id of the cart line, new or existing.
+    validate_line(user_id, movie_id, quantity)
+
+    table = CartItem.__table__
+    stmt = _insert()(table).values(
+        user_id=user_id, movie_id=movie_id, quantity=quantity
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.user_id, table.c.movie_id],
+        set_={"quantity": table.c.quantity + stmt.excluded.quantity},
+    ).returning(table.c.id)
+    cart_item_id = db.session.execute(stmt).scalar_one()
+    # Core statements only tell the cache which table changed, not whose cart.
+    mark_changed(db.session, f"user:{user_id}")
+    return cart_item_id
+
+
+def movie_ids_from(payload):
+    movie_ids = payload.get("movie_ids") if isinstance(payload, dict) else None
+    if not isinstance(movie_ids, list) or not movie_ids:
+        raise CartError("movie_ids must be a non-empty list.")
+    if len(movie_ids) > MAX_BATCH_SIZE:
+        raise CartError(f"At most {MAX_BATCH_SIZE} movie_ids per batch.")
+    if not all(type(movie_id) is int for movie_id in movie_ids):
+        raise CartError("movie_ids must be integers.")
+    return movie_ids
+
+
+def add_many(user_id, movie_ids):
+    # A movie listed n times adds n to its quantity; a {movie_id: quantity}
+    # mapping works too. Returns the changed lines and the ids that aren't
+    # movies.
+    counts = Counter(movie_ids)
+    known = set(
+        db.session.execute(select(Movie.id).where(Movie.id.in_(counts))).scalars()
+    )
+    missing = sorted(movie_id for movie_id in counts if movie_id not in known)
+    if not known:
+        return [], missing
+
+    table = CartItem.__table__
+    stmt = _insert()(table).values(
+        [
+            {"user_id": user_id, "movie_id": movie_id, "quantity": counts[movie_id]}
+            for movie_id in sorted(known)
+        ]
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.user_id, table.c.movie_id],
+        set_={"quantity": table.c.quantity + stmt.excluded.quantity},
+    ).returning(table.c.id, table.c.movie_id, table.c.quantity)
+    lines = [dict(row._mapping) for row in db.session.execute(stmt)]
+    mark_changed(db.session, f"user:{user_id}")
+    return sorted(lines, key=lambda line: line["movie_id"]), missing
+
+
+def remove_many(user_id, movie_ids):
+    # Drops whole lines. Returns the movie ids that were in the cart.
+    table = CartItem.__table__
+    result = db.session.execute(
+        delete(table)
+        .where(table.c.user_id == user_id, table.c.movie_id.in_(set(movie_ids)))
+        .returning(table.c.movie_id)
+    )
+    removed = sorted(result.scalars())
+    mark_changed(db.session, f"user:{user_id}")
+    return removed
+
+
+def user_cart(user_id, view):
+    # The user's cart lines, loaded for serializing with ``view``.
+    return CartItem.query.filter(CartItem.user_id == user_id).options(
+        *eager(CartItem, *view)
+    )
+
+
+def lines_by_movie(filters, limit=None):
+    # One row per movie: how many carts hold it and the total quantity,
+    # most wanted first. ``filters`` narrows the cart lines counted.
+    quantity = func.sum(CartItem.quantity)
+    query = (
+        db.session.query(
+            CartItem.movie_id,
+            Movie.name,
+            func.count(CartItem.id).label("carts"),
+            quantity.label("quantity"),
+        )
+        .outerjoin(Movie, Movie.id == CartItem.movie_id)
+        .group_by(CartItem.movie_id, Movie.name)
+    )
+    query = filters(query).order_by(quantity.desc(), CartItem.movie_id)
+    if limit is not None:
+        query = query.limit(limit)
+    return [dict(row._mapping) for row in query]
+
+
+def cart_summary(user_id):
+    # One aggregate over cart_items LEFT JOIN movies for the cart badge and
+    # total, instead of serializing every item with its movie.
+    items, titles, total = db.session.execute(
+        select(
+            func.coalesce(func.sum(CartItem.quantity), 0),
+            func.count(func.distinct(CartItem.movie_id)),
+            func.coalesce(func.sum(Movie.price * CartItem.quantity), 0),
+        )
+        .select_from(CartItem)
+        .outerjoin(Movie, Movie.id == CartItem.movie_id)
+        .where(CartItem.user_id == user_id)
+    ).one()
+    return {"items": items, "titles": titles, "total": round(float(total), 2)}
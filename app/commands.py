@@ -0,0 +1,89 @@
+import statistics
+import time
+
+import bcrypt as pybcrypt
+import click
+
+from app import app, bcrypt, db
+from app.query_plans import check_plans
+from app.ratings import recompute_ratings
+
+# Flask CLI commands: flask --app run.py <command>
+
+
+@app.cli.command("repair-ratings")
+def repair_ratings():
+    """Recompute movie rating aggregates from the reviews table."""
+    count = recompute_ratings()
+    db.session.commit()
+    click.echo(f"Recomputed ratings for {count} movies.")
+
+
+@app.cli.command("bcrypt-calibrate")
+@click.option("--target-ms", default=250, show_default=True, help="Latency budget.")
+@click.option("--samples", default=3, show_default=True, help="Hashes per cost.")
+@click.option("--min-cost", default=8, show_default=True)
+@click.option("--max-cost", default=16, show_default=True)
+def bcrypt_calibrate(target_ms, samples, min_cost, max_cost):
+    """Measure bcrypt latency on this machine and recommend a work factor."""
+    password = b"calibration-password"
+    recommended = None
+    click.echo(f"Current BCRYPT_LOG_ROUNDS: {bcrypt._log_rounds}")
+    for cost in range(min_cost, max_cost + 1):
+        salt = pybcrypt.gensalt(rounds=cost)
+        timings = []
+        for _ in range(samples):
+            started = time.perf_counter()
+            pybcrypt.hashpw(password, salt)
+            timings.append((time.perf_counter() - started) * 1000)
+        median = statistics.median(timings)
+        click.echo(f"  cost {cost:>2}: {median:8.1f} ms")
+        if median <= target_ms:
+            recommended = cost
+        else:
+            # Each step doubles the work, nothing above will fit either.
+            break
+    if recommended is None:
+        raise click.ClickException(
+            f"Even cost {min_cost} takes longer than {target_ms} ms on this "
+            "machine; raise --target-ms or lower --min-cost."
+        )
+    click.echo(
+        f"Recommended BCRYPT_LOG_ROUNDS={recommended} for a {target_ms} ms target."
+    )
+
+
+@app.cli.command("check-query-plans")
+@click.option(
+    "--seed",
+    "seed_movies",
+    default=0,
+    show_default=True,
+    help="Seed this many movies (and proportionate rows) first; rolled back.",
+)
+@click.option("--verbose", is_flag=True, help="Print every plan.")
+def check_query_plans(seed_movies, verbose):
+    """EXPLAIN the hot lookups and fail if any of them scans a whole table.
+
+    Meant for CI against a migrated scratch database:
+
+        flask db upgrade && flask check-query-plans --seed 20000
+    """
+    failures = []
+    try:
+        for name, statement, lines, scans in check_plans(seed_movies):
+            if verbose or scans:
+                status = "SEQ SCAN" if scans else "ok"
+                click.echo(f"{status:>8}  {name}: {' '.join(statement.split())}")
+                for line in lines:
+                    click.echo(f"          {line}")
+            if scans and name not in failures:
+                failures.append(name)
+    except ValueError as error:
+        raise click.ClickException(str(error))
+    if failures:
+        raise click.ClickException(
+            f"{len(failures)} lookup{'' if len(failures) == 1 else 's'} "
+            f"without an index: {', '.join(failures)}."
+        )
+    click.echo("All hot lookups use an index.")
@@ -0,0 +1,27 @@
+from flask import request
+
+from app.loading import build_plan
+
+# Sparse fieldsets: ?fields=id,name,image,price
+#
+# The requested names become the ``only`` tuple for both the loader plan and
+# the serializer, so unrequested columns are never selected and unrequested
+# relationships are never loaded.
+
+
+class FieldsError(ValueError):
+    pass
+
+
+def requested_fields(model, rules=(), only=()):
+    raw = request.args.get("fields")
+    if not raw:
+        return ()
+
+    fields = tuple(dict.fromkeys(f.strip() for f in raw.split(",") if f.strip()))
+    plan = build_plan(model, tuple(rules), tuple(only))
+    allowed = plan.columns + tuple(plan.relations)
+    unknown = [field for field in fields if field not in allowed]
+    if unknown:
+        raise FieldsError(f"Unknown fields: {', '.join(unknown)}.")
+    return fields
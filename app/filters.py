@@ -0,0 +1,72 @@
+from datetime import datetime
+
+from flask import request
+
+from app.models import CartItem, Movie
+
+# Server-side filtering for GET /movies and the admin listing of
+# GET /cart_items.
+#
+# Sorting is restricted to one of the columns that have a (column, id) index
+# so that every accepted ?sort= can be served by an index range scan together
+# with keyset pagination. The one exception is ?director= with a ?sort= on
+# another column: the director's movies are read from its index and sorted,
+# which only ever sorts one director's filmography.
+
+MOVIE_SORTABLE = {
+    "id": Movie.id,
+    "name": Movie.name,
+    "year": Movie.year,
+    "director": Movie.director,
+    "price": Movie.price,
+    "rating": Movie.avg_rating,
+}
+
+
+class FilterError(ValueError):
+    pass
+
+
+def _arg(name, type_, label=None):
+    value = request.args.get(name)
+    if value is None or value == "":
+        return None
+    try:
+        return type_(value)
+    except ValueError:
+        raise FilterError(f"{name} must be a valid {label or type_.__name__}.")
+
+
+def filter_movies(query):
+    year_min = _arg("year_min", int)
+    year_max = _arg("year_max", int)
+    director = _arg("director", str)
+    price_max = _arg("price_max", float)
+
+    if year_min is not None:
+        query = query.filter(Movie.year >= year_min)
+    if year_max is not None:
+        query = query.filter(Movie.year <= year_max)
+    if director is not None:
+        query = query.filter(Movie.director == director)
+    if price_max is not None:
+        query = query.filter(Movie.price <= price_max)
+    return query
+
+
+def filter_cart_items(query):
+    user_id = _arg("user_id", int)
+    movie_id = _arg("movie_id", int)
+    # ISO 8601 dates or datetimes; created_before is exclusive.
+    created_after = _arg("created_after", datetime.fromisoformat, "ISO 8601 date")
+    created_before = _arg("created_before", datetime.fromisoformat, "ISO 8601 date")
+
+    if user_id is not None:
+        query = query.filter(CartItem.user_id == user_id)
+    if movie_id is not None:
+        query = query.filter(CartItem.movie_id == movie_id)
+    if created_after is not None:
+        query = query.filter(CartItem.created_at >= created_after)
+    if created_before is not None:
+        query = query.filter(CartItem.created_at < created_before)
+    return query
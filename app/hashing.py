@@ -0,0 +1,115 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+from app import app, bcrypt
+
+# Password hashing off the request thread.
+#
+# bcrypt releases the GIL while it hashes, so a small thread pool is enough to
+# keep 200-300 ms of hashing per login from stalling other requests. The pool
+# admits at most workers + queue jobs at a time; anything beyond that fails
+# fast with PoolBusy (503) instead of piling up behind a login storm.
+
+
+class PoolBusy(RuntimeError):
+    pass
+
+
+class HashPool:
+    def __init__(self, workers, queue, timeout):
+        self.workers = workers
+        self.queue = queue
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="bcrypt"
+        )
+        self._slots = threading.BoundedSemaphore(workers + queue)
+        self._lock = threading.Lock()
+        self._stats = {
+            "completed": 0,
+            "rejected": 0,
+            "timed_out": 0,
+            "wait_seconds_total": 0.0,
+            "wait_seconds_max": 0.0,
+            "hash_seconds_total": 0.0,
+            "hash_seconds_max": 0.0,
+        }
+
+    def run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            self._record(rejected=1)
+            raise PoolBusy("Too many password operations in progress.")
+
+        submitted = time.perf_counter()
+
+        def job():
+            started = time.perf_counter()
+            result = fn(*args)
+            return result, started - submitted, time.perf_counter() - started
+
+        try:
+            future = self._executor.submit(job)
+        except RuntimeError:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+
+        try:
+            result, waited, hashed = future.result(timeout=self.timeout)
+        except TimeoutError:
+            future.cancel()
+            self._record(timed_out=1)
+            raise PoolBusy("Password operation timed out.")
+
+        self._record(completed=1, wait=waited, hash=hashed)
+        return result
+
+    def _record(self, completed=0, rejected=0, timed_out=0, wait=0.0, hash=0.0):
+        with self._lock:
+            stats = self._stats
+            stats["completed"] += completed
+            stats["rejected"] += rejected
+            stats["timed_out"] += timed_out
+            stats["wait_seconds_total"] += wait
+            stats["wait_seconds_max"] = max(stats["wait_seconds_max"], wait)
+            stats["hash_seconds_total"] += hash
+            stats["hash_seconds_max"] = max(stats["hash_seconds_max"], hash)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        completed = stats["completed"] or 1
+        stats["wait_seconds_avg"] = stats["wait_seconds_total"] / completed
+        stats["hash_seconds_avg"] = stats["hash_seconds_total"] / completed
+        stats["workers"] = self.workers
+        stats["queue"] = self.queue
+        return stats
+
+
+hash_pool = HashPool(
+    workers=app.config.get("BCRYPT_POOL_WORKERS") or os.cpu_count() or 2,
+    queue=app.config.get("BCRYPT_POOL_QUEUE", 32),
+    timeout=app.config.get("BCRYPT_POOL_TIMEOUT", 5),
+)
+
+
+def hash_password(password):
+    return hash_pool.run(bcrypt.generate_password_hash, password).decode("utf-8")
+
+
+def check_password(pw_hash, password):
+    return hash_pool.run(bcrypt.check_password_hash, pw_hash, password)
+
+
+def hash_cost(pw_hash):
+    # "$2b$12$<salt+hash>" -> 12
+    try:
+        return int(pw_hash.split("$")[2])
+    except (AttributeError, IndexError, ValueError):
+        return None
+
+
+def needs_rehash(pw_hash):
+    return hash_cost(pw_hash) != bcrypt._log_rounds
@@ -0,0 +1,189 @@
+import csv
+import io
+import json
+
+from sqlalchemy.dialects import postgresql, sqlite
+
+from app import db
+from app.cache import mark_changed
+from app.models import Movie
+
+# Bulk movie ingestion for POST /movies/bulk.
+#
+# Rows are type-checked field by field, de-duplicated by name and
+# written in batches: through COPY into a temp table on Postgres/psycopg2,
+# otherwise with one executemany INSERT ... ON CONFLICT per batch.
+
+MOVIE_FIELDS = ("name", "image", "year", "director", "description", "price")
+BATCH_SIZE = 1000
+
+
+class IngestError(ValueError):
+    pass
+
+
+def read_rows(request):
+    # Yields (row number, parsed row or exception) from a JSON array or an
+    # NDJSON stream; NDJSON is parsed line by line as it arrives.
+    if request.mimetype in ("application/x-ndjson", "application/jsonl"):
+        number = 0
+        for line in request.stream:
+            if not line.strip():
+                continue
+            try:
+                yield number, json.loads(line)
+            except ValueError:
+                yield number, IngestError("Row is not valid JSON.")
+            number += 1
+        return
+
+    rows = request.get_json(silent=True)
+    if not isinstance(rows, list):
+        raise IngestError("Expected a JSON array or an NDJSON stream of movies.")
+    yield from enumerate(rows)
+
+
+def validate_row(row):
+    if isinstance(row, Exception):
+        raise row
+    if not isinstance(row, dict):
+        raise IngestError("Row must be a JSON object.")
+
+    values = {}
+    for key in ("name", "image", "director", "description"):
+        value = row.get(key)
+        if not isinstance(value, str) or not value:
+            raise IngestError(f"{key} must be a non-empty string.")
+        values[key] = value
+    year = row.get("year")
+    if isinstance(year, bool) or not isinstance(year, int) or year < 1900:
+        raise IngestError("Year must be an integer and it has to be greater than 1900.")
+    values["year"] = year
+    price = row.get("price")
+    if isinstance(price, bool) or not isinstance(price, (int, float)):
+        raise IngestError("price must be a number.")
+    values["price"] = float(price)
+    return values
+
+
+def _copy_batch(rows, upsert):
+    cursor = db.session.connection().connection.cursor()
+    if not hasattr(cursor, "copy_expert"):
+        cursor.close()
+        return None
+    try:
+        return _copy_with(cursor, rows, upsert)
+    finally:
+        cursor.close()
+
+
+def _copy_with(cursor, rows, upsert):
+    cursor.execute(
+        "CREATE TEMP TABLE IF NOT EXISTS movies_ingest ("
+        "name varchar, image varchar, year integer, director varchar, "
+        "description varchar, price double precision) ON COMMIT DROP"
+    )
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow([row[field] for field in MOVIE_FIELDS])
+    buffer.seek(0)
+    cursor.copy_expert(
+        f"COPY movies_ingest ({', '.join(MOVIE_FIELDS)}) FROM STDIN WITH (FORMAT csv)",
+        buffer,
+    )
+
+    columns = ", ".join(MOVIE_FIELDS)
+    if upsert:
+        assignments = ", ".join(
+            f"{field} = EXCLUDED.{field}" for field in MOVIE_FIELDS if field != "name"
+        )
+        conflict = f"DO UPDATE SET {assignments}"
+    else:
+        conflict = "DO NOTHING"
+    cursor.execute(
+        f"INSERT INTO movies ({columns}) SELECT {columns} FROM movies_ingest "
+        f"ON CONFLICT (name) {conflict} RETURNING name"
+    )
+    written = {name for (name,) in cursor.fetchall()}
+    cursor.execute("TRUNCATE movies_ingest")
+    mark_changed(db.session, "movies")
+    return written
+
+
+def _insert_batch(rows, upsert):
+    dialect = db.session.get_bind().dialect.name
+    if dialect == "postgresql":
+        insert = postgresql.insert
+    elif dialect == "sqlite":
+        insert = sqlite.insert
+    else:
+        raise IngestError(f"Bulk ingestion is not supported on {dialect}.")
+
+    table = Movie.__table__
+    stmt = insert(table)
+    if upsert:
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.name],
+            set_={
+                field: stmt.excluded[field] for field in MOVIE_FIELDS if field != "name"
+            },
+        )
+    else:
+        stmt = stmt.on_conflict_do_nothing(index_elements=[table.c.name])
+    result = db.session.execute(stmt.returning(table.c.name), rows)
+    return set(result.scalars())
+
+
+def write_batch(rows, upsert):
+    # Returns the names that were inserted (or updated when upserting).
+    if not rows:
+        return set()
+    written = None
+    if db.session.get_bind().dialect.name == "postgresql":
+        written = _copy_batch(rows, upsert)
+    if written is None:
+        written = _insert_batch(rows, upsert)
+    db.session.commit()
+    return written
+
+
+def ingest_movies(request, upsert=True):
+    report = {"received": 0, "written": 0, "errors": []}
+    batch = {}
+    numbers = {}
+
+    def flush():
+        written = write_batch(list(batch.values()), upsert)
+        report["written"] += len(written)
+        for name in batch:
+            if name not in written:
+                report["errors"].append(
+                    {"row": numbers[name], "error": f"Movie {name} already exists."}
+                )
+        batch.clear()
+        numbers.clear()
+
+    for number, row in read_rows(request):
+        report["received"] += 1
+        try:
+            values = validate_row(row)
+        except ValueError as error:
+            report["errors"].append({"row": number, "error": str(error)})
+            continue
+
+        name = values["name"]
+        if name in batch and not upsert:
+            report["errors"].append(
+                {"row": number, "error": f"Movie {name} appears more than once."}
+            )
+            continue
+        # Later rows for the same name win, like consecutive upserts would.
+        batch[name] = values
+        numbers[name] = number
+        if len(batch) >= BATCH_SIZE:
+            flush()
+
+    flush()
+    report["errors"].sort(key=lambda error: error["row"])
+    return report
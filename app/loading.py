@@ -0,0 +1,108 @@
+from collections import namedtuple
+from functools import lru_cache
+
+from sqlalchemy import inspect
+from sqlalchemy.orm import (
+    ColumnProperty,
+    RelationshipProperty,
+    joinedload,
+    load_only,
+    selectinload,
+)
+
+# Loader strategies derived from serializer rules.
+#
+# The same ``rules``/``only`` tuples we hand to ``to_dict`` tell us exactly
+# which relationships will be walked, so we can load them up front instead of
+# letting every serialized row trigger its own lazy load. Collections use
+# SELECT ... IN batches, many-to-one references are joined into the main query.
+
+MAX_DEPTH = 6
+
+Plan = namedtuple("Plan", "model columns relations")
+
+
+def _rules_tree(rules):
+    tree = {}
+    for rule in rules:
+        negative = rule.startswith("-")
+        keys = rule.lstrip("-").split(".")
+        node = tree
+        for key in keys[:-1]:
+            node = node.setdefault(key, {"exclude": False, "children": {}})["children"]
+        leaf = node.setdefault(keys[-1], {"exclude": False, "children": {}})
+        if negative:
+            leaf["exclude"] = True
+    return tree
+
+
+def _build(model, rules_node, only_node, depth):
+    if depth > MAX_DEPTH:
+        raise ValueError(
+            f"Serialization rules for {model.__name__} recurse without bound."
+        )
+
+    columns = []
+    relations = {}
+    for prop in inspect(model).attrs:
+        key = prop.key
+        rule = rules_node.get(key)
+        if rule and rule["exclude"] and not rule["children"]:
+            continue
+        if only_node is not None and key not in only_node:
+            continue
+
+        if isinstance(prop, ColumnProperty):
+            columns.append(key)
+        elif isinstance(prop, RelationshipProperty):
+            child_rules = rule["children"] if rule else {}
+            # "movie.id" in only narrows the nested object, a bare "movie" keeps it whole.
+            child_only = (
+                only_node[key]["children"] or None if only_node is not None else None
+            )
+            relations[key] = (
+                prop,
+                _build(prop.mapper.class_, child_rules, child_only, depth + 1),
+            )
+    return Plan(model, tuple(columns), relations)
+
+
+@lru_cache(maxsize=None)
+def build_plan(model, rules=(), only=()):
+    only_node = _rules_tree(only) if only else None
+    return _build(model, _rules_tree(rules), only_node, 0)
+
+
+def _projection(plan):
+    # Columns nobody serializes stay deferred; the primary key is always loaded.
+    mapper = inspect(plan.model)
+    if len(plan.columns) == len(mapper.column_attrs):
+        return None
+    return [getattr(plan.model, key) for key in plan.columns]
+
+
+def _options(plan):
+    options = []
+    for key, (prop, child) in plan.relations.items():
+        attr = getattr(plan.model, key)
+        loader = selectinload(attr) if prop.uselist else joinedload(attr)
+        columns = _projection(child)
+        if columns is not None:
+            loader = loader.load_only(*columns)
+        nested = _options(child)
+        options.append(loader.options(*nested) if nested else loader)
+    return options
+
+
+@lru_cache(maxsize=None)
+def _cached_options(model, rules, only):
+    plan = build_plan(model, rules, only)
+    options = _options(plan)
+    columns = _projection(plan)
+    if columns is not None:
+        options.append(load_only(*columns))
+    return tuple(options)
+
+
+def eager(model, rules=(), only=()):
+    return _cached_options(model, tuple(rules), tuple(only))
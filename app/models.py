@@ -10,6 +10,13 @@ from app import db
 
 class Movie(db.Model, SerializerMixin):
     __tablename__ = "movies"
+    # (column, id) indexes back the whitelisted ?sort= keys on GET /movies.
+    __table_args__ = (
+        db.Index("ix_movies_year_id", "year", "id"),
+        db.Index("ix_movies_director_id", "director", "id"),
+        db.Index("ix_movies_price_id", "price", "id"),
+        db.Index("ix_movies_avg_rating_id", "avg_rating", "id"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String, unique=True)
@@ -19,6 +26,11 @@ class Movie(db.Model, SerializerMixin):
     description = db.Column(db.String, nullable=False)
     price = db.Column(db.Float, nullable=False)
 
+    # Review aggregates, kept up to date by app/ratings.py.
+    rating_sum = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    review_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    avg_rating = db.Column(db.Float, nullable=False, default=0, server_default="0")
+
     reviews = db.relationship("Review", back_populates="movie", cascade="all")
     cart_items = db.relationship("CartItem", back_populates="movie_cart", cascade="all")
 
@@ -76,8 +88,20 @@ class User(db.Model, SerializerMixin):
 
 class CartItem(db.Model, SerializerMixin):
     __tablename__ = "cart_items"
+    # One line per movie per user; adding it again raises the quantity. The
+    # unique constraint also serves user_id lookups, movie_id has its own
+    # index, and created_at backs the date filters of the admin cart listing.
+    __table_args__ = (
+        db.UniqueConstraint(
+            "user_id", "movie_id", name="uq_cart_items_user_id_movie_id"
+        ),
+        db.Index("ix_cart_items_created_at", "created_at"),
+        db.Index("ix_cart_items_movie_id", "movie_id"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
+    quantity = db.Column(db.Integer, nullable=False, default=1, server_default="1")
+    created_at = db.Column(db.DateTime, default=db.func.now())
 
     movie_id = db.Column(db.Integer, db.ForeignKey("movies.id"))
     user_id = db.Column(db.Integer, db.ForeignKey("users.id"))
@@ -91,6 +115,12 @@ class CartItem(db.Model, SerializerMixin):
 
 class Review(db.Model, SerializerMixin):
     __tablename__ = "reviews"
+    # (user_id, movie_id) backs the "movies reviewed by this user" lookup
+    # without touching rows and covers user_id lookups on its own.
+    __table_args__ = (
+        db.Index("ix_reviews_user_id_movie_id", "user_id", "movie_id"),
+        db.Index("ix_reviews_movie_id", "movie_id"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     rating = db.Column(db.Integer)
@@ -186,6 +216,10 @@ class Albums(db.Model, SerializerMixin):
 
 class AlbumReviews(db.Model, SerializerMixin):
     __tablename__ = "albumreviews"
+    __table_args__ = (
+        db.Index("ix_albumreviews_album_id", "album_id"),
+        db.Index("ix_albumreviews_artist_id", "artist_id"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     rating = db.Column(db.Integer)
@@ -203,3 +237,22 @@ class AlbumReviews(db.Model, SerializerMixin):
             raise ValueError("Rating must be a number between 1 and 10.")
         else:
             return value
+
+
+# ------------------------------------------------------------------------
+
+
+class UserSession(db.Model):
+    # Server-side sessions for SESSION_BACKEND=sql (see app/sessions.py).
+    # Deliberately not related to User so it never shows up in serialized users.
+    __tablename__ = "user_sessions"
+    __table_args__ = (
+        db.Index("ix_user_sessions_user_id", "user_id"),
+        db.Index("ix_user_sessions_last_seen", "last_seen"),
+    )
+
+    id = db.Column(db.String, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id", ondelete="CASCADE"))
+    data = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False)
+    last_seen = db.Column(db.DateTime, nullable=False)
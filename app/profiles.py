@@ -0,0 +1,71 @@
+from sqlalchemy import select
+
+from app import db
+from app.cache import cache
+from app.loading import eager
+from app.models import Movie, Review, User
+from app.projections import projection
+from app.serializers import serialize, serialize_all
+
+# Session profile snapshots for Login and /check_session.
+#
+# The profile (user, their reviews and cart, and the movies they reviewed) is
+# cached per user under the version of that user's own writes plus the movies
+# table, so /check_session is a single cache lookup until one of them changes.
+# The detail view nests other users' reviews and cart items in those movies,
+# so it is keyed on those tables as well.
+#
+# A user's movies are resolved with one semi-join over
+# ix_reviews_user_id_movie_id, so a user with thousands of reviews costs one
+# indexed scan rather than a lazy load per review.
+
+
+def user_movies(user_id, view=None):
+    # Each movie the user reviewed, once, however many reviews they left on it.
+    reviewed = select(Review.movie_id).where(Review.user_id == user_id)
+    view = view or projection(Movie, "summary")
+    return Movie.query.options(*eager(Movie, *view)).filter(Movie.id.in_(reviewed))
+
+
+def profile_tables(view="summary"):
+    # Tables a profile is built from besides the user's own rows.
+    if view == "detail":
+        return ("movies", "reviews", "cart_items")
+    return ("movies",)
+
+
+def _key(user_id, view):
+    names = [*profile_tables(view), f"user:{user_id}"]
+    stamp = cache.stamp(names)
+    return None if stamp is None else f"profile:{user_id}:{view}:{stamp}"
+
+
+def build_profile(user, view="summary", key=None):
+    # ``key`` must have been read before ``user`` was loaded: a write
+    # committed in between then leaves the body under the old version
+    # instead of passing it off as current.
+    body = serialize(user, *projection(User, "detail"))
+    movie_view = projection(Movie, view)
+    movies = user_movies(user.id, movie_view).order_by(Movie.id).all()
+    body["movies"] = serialize_all(Movie, movies, *movie_view)
+    if key is not None:
+        cache.set(key, body)
+    return body
+
+
+def cached_profile(user_id, view="summary"):
+    if user_id is None:
+        return None
+    key = _key(user_id, view)
+    if key is not None:
+        body = cache.get(key)
+        if body is not None:
+            return body
+
+    user = db.session.get(
+        User,
+        user_id,
+        options=eager(User, *projection(User, "detail")),
+        populate_existing=True,
+    )
+    return build_profile(user, view, key) if user else None
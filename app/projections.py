@@ -0,0 +1,139 @@
+from collections import namedtuple
+
+from flask import request
+from sqlalchemy import inspect
+
+from app.models import User, Movie, CartItem, Review, Artists, Albums, AlbumReviews
+
+# Named projections for serialized resources.
+#
+# Every resource has a "detail" shape, the rules it has always been serialized
+# with, and a "summary" shape that keeps nested movies, users, albums and
+# artists down to a few columns. A handler picks a View and passes it to
+# eager(), serialize() and serialize_all(), which all take (rules, only).
+#
+# Nested objects follow ?view=summary|detail and default to summary; the
+# top-level object of a by-id or list endpoint is always its detail shape.
+
+View = namedtuple("View", "rules only")
+
+VIEWS = ("summary", "detail")
+
+MOVIE_SUMMARY = (
+    "id",
+    "name",
+    "image",
+    "year",
+    "director",
+    "price",
+    "avg_rating",
+    "review_count",
+)
+USER_SUMMARY = ("id", "username")
+ALBUM_SUMMARY = ("id", "name", "year", "cover", "artist_name")
+ARTIST_SUMMARY = ("id", "name", "image")
+
+
+class ViewError(ValueError):
+    pass
+
+
+def _columns(model):
+    return tuple(prop.key for prop in inspect(model).column_attrs)
+
+
+def _nested(key, fields):
+    return tuple(f"{key}.{field}" for field in fields)
+
+
+PROJECTIONS = {
+    Movie: {
+        "summary": View((), MOVIE_SUMMARY),
+        "detail": View(
+            (
+                "-reviews.movie",
+                "-reviews.user",
+                "-cart_items.movie_cart",
+                "-cart_items.user_cart",
+            ),
+            (),
+        ),
+    },
+    User: {
+        "summary": View((), USER_SUMMARY),
+        "detail": View(
+            (
+                "-reviews.movie",
+                "-reviews.user",
+                "-cart_items.movie_cart",
+                "-cart_items.user_cart",
+                "-password_hash",
+            ),
+            (),
+        ),
+    },
+    Review: {
+        "summary": View(
+            (),
+            _columns(Review)
+            + _nested("movie", MOVIE_SUMMARY)
+            + _nested("user", USER_SUMMARY),
+        ),
+        "detail": View(
+            (
+                "-movie.reviews",
+                "-user.reviews",
+                "-user.cart_items",
+                "-movie.cart_items",
+                "-user.password_hash",
+            ),
+            (),
+        ),
+    },
+    CartItem: {
+        "summary": View(
+            (),
+            _columns(CartItem)
+            + _nested("movie_cart", MOVIE_SUMMARY)
+            + _nested("user_cart", USER_SUMMARY),
+        ),
+        "detail": View(
+            (
+                "-movie_cart.cart_items",
+                "-user_cart.cart_items",
+                "-movie_cart.reviews",
+                "-user_cart.reviews",
+                "-user_cart.password_hash",
+            ),
+            (),
+        ),
+    },
+    Artists: {
+        "summary": View((), ARTIST_SUMMARY),
+        "detail": View(("-artist_reviews",), ()),
+    },
+    Albums: {
+        "summary": View((), ALBUM_SUMMARY),
+        "detail": View(("-album_reviews",), ()),
+    },
+    AlbumReviews: {
+        "summary": View(
+            (),
+            _columns(AlbumReviews)
+            + _nested("artist", ARTIST_SUMMARY)
+            + _nested("album", ALBUM_SUMMARY),
+        ),
+        "detail": View(("-artist.artist_reviews", "-album.album_reviews"), ()),
+    },
+}
+
+
+def requested_view():
+    view = request.args.get("view", "summary")
+    if view not in VIEWS:
+        raise ViewError(f"view must be one of: {', '.join(VIEWS)}.")
+    return view
+
+
+def projection(model, view=None):
+    return PROJECTIONS[model][view or requested_view()]
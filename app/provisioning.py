@@ -0,0 +1,186 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import bcrypt as pybcrypt
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql, sqlite
+
+from app import app, bcrypt, db
+from app.models import User
+
+# Bulk user provisioning for POST /users/bulk.
+#
+# Rows are validated and checked against existing usernames first, so no time
+# is spent hashing passwords that could never be inserted. The rest are hashed
+# across a process pool and written with one INSERT ... ON CONFLICT (username)
+# DO NOTHING RETURNING per batch; usernames taken by a concurrent writer in
+# the meantime come back as per-row errors too.
+
+USER_TYPES = ("customer", "admin")
+BATCH_SIZE = 1000
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+class ProvisionError(ValueError):
+    pass
+
+
+class HashingUnavailable(RuntimeError):
+    pass
+
+
+def _hash(password, rounds):
+    # Runs in a worker process: plain bcrypt, same format as Flask-Bcrypt.
+    salt = pybcrypt.gensalt(rounds)
+    return pybcrypt.hashpw(password.encode("utf-8"), salt).decode("utf-8")
+
+
+def _hash_pool():
+    # One pool for the life of the process, started on first use. Workers
+    # come from a forkserver: forking this multi-threaded web worker directly
+    # could copy a lock some other thread holds and deadlock the child.
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            workers = app.config.get("BCRYPT_BULK_WORKERS") or os.cpu_count() or 2
+            _pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("forkserver"),
+            )
+        return _pool
+
+
+def _discard_pool(pool):
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _hash_all(passwords):
+    # A worker that dies (OOM-killed, say) breaks its pool for good: replace
+    # the pool and give the batch one more try.
+    rounds = [bcrypt._log_rounds] * len(passwords)
+    for _ in range(2):
+        pool = _hash_pool()
+        try:
+            return list(pool.map(_hash, passwords, rounds, chunksize=8))
+        except BrokenProcessPool:
+            _discard_pool(pool)
+    raise HashingUnavailable("Password hashing is unavailable, try again later.")
+
+
+def validate_row(row):
+    if not isinstance(row, dict):
+        raise ProvisionError("Row must be a JSON object.")
+    username = row.get("username")
+    if not isinstance(username, str) or not 3 <= len(username) <= 25:
+        raise ProvisionError("username must be 3 to 25 characters long.")
+    # Login and Signup take the plaintext in password_hash.
+    password = row.get("password", row.get("password_hash"))
+    if not isinstance(password, str) or not password:
+        raise ProvisionError("password is required.")
+    user_type = row.get("type", "customer")
+    if user_type not in USER_TYPES:
+        raise ProvisionError(f"type must be one of: {', '.join(USER_TYPES)}.")
+    return {"username": username, "password": password, "type": user_type}
+
+
+def _existing(usernames):
+    rows = db.session.execute(select(User.username).where(User.username.in_(usernames)))
+    return set(rows.scalars())
+
+
+def _insert(rows):
+    dialect = db.session.get_bind().dialect.name
+    if dialect == "postgresql":
+        insert = postgresql.insert
+    elif dialect == "sqlite":
+        insert = sqlite.insert
+    else:
+        raise ProvisionError(f"Bulk provisioning is not supported on {dialect}.")
+
+    table = User.__table__
+    stmt = (
+        insert(table)
+        .on_conflict_do_nothing(index_elements=[table.c.username])
+        .returning(table.c.id, table.c.username)
+    )
+    result = db.session.execute(stmt, rows)
+    return {username: id for id, username in result}
+
+
+def _write_batch(batch, report):
+    # batch: [(row number, values)], all with distinct usernames.
+    taken = _existing([values["username"] for _, values in batch])
+    pending = []
+    for number, values in batch:
+        if values["username"] in taken:
+            report["errors"].append(
+                {"row": number, "error": f"Username {values['username']} is taken."}
+            )
+        else:
+            pending.append((number, values))
+    if not pending:
+        return
+
+    hashes = _hash_all([values["password"] for _, values in pending])
+    rows = [
+        {
+            "username": values["username"],
+            "password_hash": pw_hash,
+            "type": values["type"],
+        }
+        for (_, values), pw_hash in zip(pending, hashes)
+    ]
+    created = _insert(rows)
+    db.session.commit()
+
+    for number, values in pending:
+        username = values["username"]
+        if username in created:
+            report["users"].append({"id": created[username], "username": username})
+        else:
+            report["errors"].append(
+                {"row": number, "error": f"Username {username} is taken."}
+            )
+
+
+def provision_users(rows):
+    if not isinstance(rows, list):
+        raise ProvisionError("Expected a JSON array of users.")
+
+    report = {"received": len(rows), "created": 0, "errors": [], "users": []}
+    batch = []
+    seen = set()
+    for number, row in enumerate(rows):
+        try:
+            values = validate_row(row)
+        except ProvisionError as error:
+            report["errors"].append({"row": number, "error": str(error)})
+            continue
+        if values["username"] in seen:
+            report["errors"].append(
+                {
+                    "row": number,
+                    "error": f"Username {values['username']} appears more than once.",
+                }
+            )
+            continue
+        seen.add(values["username"])
+        batch.append((number, values))
+        if len(batch) >= BATCH_SIZE:
+            _write_batch(batch, report)
+            batch = []
+    if batch:
+        _write_batch(batch, report)
+
+    report["created"] = len(report["users"])
+    report["errors"].sort(key=lambda error: error["row"])
+    return report
@@ -0,0 +1,255 @@
+import random
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import event, insert, select, text
+
+from app import app, db
+from app.carts import cart_summary, user_cart
+from app.filters import MOVIE_SORTABLE, filter_cart_items, filter_movies
+from app.loading import eager
+from app.models import (
+    AlbumReviews,
+    Albums,
+    Artists,
+    CartItem,
+    Movie,
+    Review,
+    User,
+    UserSession,
+)
+from app.pagination import paginate, parse_sort
+from app.profiles import build_profile
+from app.projections import projection
+from app.serializers import serialize
+
+# Query plan regression check for `flask check-query-plans`.
+#
+# The hot lookups below run the app's own code paths (profile, cart, movie
+# page, list pages and relationship loads) while every SELECT they send is
+# recorded, then each statement is EXPLAINed with the parameters it was sent
+# with. Planner settings are left alone and statistics are refreshed first, so
+# a lookup whose index is missing or unusable shows up as the sequential scan
+# the database would really run. With --seed, the database is first filled to
+# a realistic size; all of it happens in one transaction that is rolled back.
+
+SEED_BATCH = 5000
+
+
+def _insert(table, rows, returning=False):
+    ids = []
+    for start in range(0, len(rows), SEED_BATCH):
+        batch = rows[start : start + SEED_BATCH]
+        if returning:
+            result = db.session.execute(insert(table).returning(table.c.id), batch)
+            ids += result.scalars().all()
+        else:
+            db.session.execute(insert(table), batch)
+    return ids
+
+
+def seed(movies):
+    # ``movies`` movies and proportionate users, reviews, carts, albums and
+    # sessions, with each user, movie and album referenced by a handful of
+    # rows, like production data.
+    rng = random.Random(0)
+    tag = uuid.uuid4().hex[:8]
+    now = datetime.utcnow()
+
+    movie_ids = _insert(
+        Movie.__table__,
+        [
+            {
+                "name": f"plan {tag} {i}",
+                "image": "image",
+                "year": 1950 + i % 75,
+                "director": f"director {i % 500}",
+                "description": "description",
+                "price": 1 + i % 20,
+            }
+            for i in range(movies)
+        ],
+        returning=True,
+    )
+    user_ids = _insert(
+        User.__table__,
+        [
+            {"username": f"plan{tag}{i}", "password_hash": "x", "type": "customer"}
+            for i in range(max(movies // 5, 1))
+        ],
+        returning=True,
+    )
+    _insert(
+        Review.__table__,
+        [
+            {
+                "rating": rng.randint(1, 5),
+                "text": "text",
+                "movie_id": rng.choice(movie_ids),
+                "user_id": rng.choice(user_ids),
+            }
+            for _ in range(movies * 5)
+        ],
+    )
+    lines = set()
+    wanted = min(movies * 2, len(user_ids) * len(movie_ids))
+    while len(lines) < wanted:
+        lines.add((rng.choice(user_ids), rng.choice(movie_ids)))
+    _insert(
+        CartItem.__table__,
+        [
+            {"user_id": user_id, "movie_id": movie_id, "quantity": 1, "created_at": now}
+            for user_id, movie_id in sorted(lines)
+        ],
+    )
+
+    artist_ids = _insert(
+        Artists.__table__,
+        [
+            {"name": f"plan {tag} {i}", "image": "image"}
+            for i in range(max(movies // 20, 1))
+        ],
+        returning=True,
+    )
+    album_ids = _insert(
+        Albums.__table__,
+        [
+            {
+                "name": f"plan {tag} {i}",
+                "year": 1950 + i % 75,
+                "song": "song",
+                "artist_name": "artist",
+            }
+            for i in range(max(movies // 2, 1))
+        ],
+        returning=True,
+    )
+    _insert(
+        AlbumReviews.__table__,
+        [
+            {
+                "rating": rng.randint(1, 10),
+                "text": "text",
+                "artist_id": rng.choice(artist_ids),
+                "album_id": rng.choice(album_ids),
+            }
+            for _ in range(movies * 2)
+        ],
+    )
+    _insert(
+        UserSession.__table__,
+        [
+            {
+                "id": f"plan{tag}{i}",
+                "user_id": rng.choice(user_ids),
+                "data": "{}",
+                "created_at": now,
+                "last_seen": now - timedelta(seconds=rng.randint(0, 86400)),
+            }
+            for i in range(max(movies // 5, 1))
+        ],
+    )
+
+
+def _sample():
+    # A user, movie, album and artist that the lookups have rows for.
+    review = db.session.execute(select(Review.user_id, Review.movie_id)).first()
+    album_review = db.session.execute(
+        select(AlbumReviews.album_id, AlbumReviews.artist_id)
+    ).first()
+    if review is None or album_review is None:
+        return None
+    return (*review, *album_review)
+
+
+def _hot_lookups(user_id, movie_id, album_id, artist_id):
+    def profile():
+        user = db.session.get(
+            User, user_id, options=eager(User, *projection(User, "detail"))
+        )
+        build_profile(user, "detail")
+
+    def movie_page():
+        movie = db.session.get(Movie, movie_id)
+        serialize(movie, *projection(Movie, "detail"))
+        [user.id for user in movie.users]
+
+    def movies_by_year():
+        rules = projection(Movie, "detail").rules
+        with app.test_request_context("/movies?sort=-year&limit=20"):
+            query = filter_movies(Movie.query.options(*eager(Movie, rules)))
+            order, sort = parse_sort("-year", MOVIE_SORTABLE, Movie.id)
+            paginate(query, order, sort)
+
+    def admin_carts_of_movie():
+        view = projection(CartItem, "summary")
+        with app.test_request_context(f"/cart_items?movie_id={movie_id}&limit=20"):
+            query = filter_cart_items(CartItem.query.options(*eager(CartItem, *view)))
+            paginate(query, [(CartItem.id, False)])
+
+    return {
+        "user profile": profile,
+        "cart": lambda: user_cart(user_id, projection(CartItem, "summary")).all(),
+        "cart summary": lambda: cart_summary(user_id),
+        "movie page": movie_page,
+        "movies by year": movies_by_year,
+        "admin carts of a movie": admin_carts_of_movie,
+        # Relationship loads, as run when cascading a delete.
+        "album reviews of an album": lambda: db.session.get(
+            Albums, album_id
+        ).album_reviews,
+        "album reviews of an artist": lambda: db.session.get(
+            Artists, artist_id
+        ).artist_reviews,
+    }
+
+
+def _record(lookup):
+    statements = []
+
+    def listener(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(("SELECT", "WITH")):
+            statements.append((statement, parameters))
+
+    event.listen(db.engine, "before_cursor_execute", listener)
+    try:
+        lookup()
+    finally:
+        event.remove(db.engine, "before_cursor_execute", listener)
+    # Identity map hits would hide the next lookup's loads.
+    db.session.expunge_all()
+    return statements
+
+
+def _explain(statement, parameters):
+    # Returns the plan lines and the ones that read a whole table.
+    conn = db.session.connection()
+    if conn.dialect.name == "postgresql":
+        rows = conn.exec_driver_sql(f"EXPLAIN {statement}", parameters)
+        lines = [row[0] for row in rows]
+        return lines, [line for line in lines if "Seq Scan" in line]
+    rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)
+    lines = [row[-1] for row in rows]
+    return lines, [
+        line
+        for line in lines
+        if line.startswith("SCAN ") and " USING " not in line and "CONSTANT" not in line
+    ]
+
+
+def check_plans(seed_movies=0):
+    # Yields (lookup, statement, plan lines, scans) for every statement the
+    # hot lookups send. Leaves nothing behind.
+    try:
+        if seed_movies:
+            seed(seed_movies)
+        db.session.execute(text("ANALYZE"))
+        sample = _sample()
+        if sample is None:
+            raise ValueError("No reviews or album reviews to look up; use --seed.")
+        for name, lookup in _hot_lookups(*sample).items():
+            for statement, parameters in _record(lookup):
+                lines, scans = _explain(statement, parameters)
+                yield name, statement, lines, scans
+    finally:
+        db.session.rollback()
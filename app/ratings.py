@@ -0,0 +1,64 @@
+from sqlalchemy import Float, case, cast, func, select, update
+
+from app import db
+from app.models import Movie, Review
+
+# Denormalized rating aggregates on movies.
+#
+# Every review write adjusts rating_sum/review_count/avg_rating of its movie
+# with a single relative UPDATE in the same transaction, so the aggregates
+# never need the reviews table to be read. recompute_ratings() rebuilds them
+# from scratch for the repair-ratings command and the seed script.
+
+
+def _average(total, count):
+    return case((count > 0, cast(total, Float) / count), else_=0.0)
+
+
+def _apply(movie_id, rating_delta, count_delta):
+    if movie_id is None or (rating_delta == 0 and count_delta == 0):
+        return
+    total = Movie.rating_sum + rating_delta
+    count = Movie.review_count + count_delta
+    db.session.execute(
+        update(Movie)
+        .where(Movie.id == movie_id)
+        .values(rating_sum=total, review_count=count, avg_rating=_average(total, count))
+        .execution_options(synchronize_session=False)
+    )
+
+
+def review_added(review):
+    _apply(review.movie_id, review.rating or 0, 1)
+
+
+def review_removed(review):
+    _apply(review.movie_id, -(review.rating or 0), -1)
+
+
+def review_changed(review, old_movie_id, old_rating):
+    if review.movie_id != old_movie_id:
+        _apply(old_movie_id, -(old_rating or 0), -1)
+        _apply(review.movie_id, review.rating or 0, 1)
+    else:
+        _apply(review.movie_id, (review.rating or 0) - (old_rating or 0), 0)
+
+
+def recompute_ratings():
+    reviews = Review.__table__
+    count = (
+        select(func.count(reviews.c.id))
+        .where(reviews.c.movie_id == Movie.id)
+        .scalar_subquery()
+    )
+    total = (
+        select(func.coalesce(func.sum(reviews.c.rating), 0))
+        .where(reviews.c.movie_id == Movie.id)
+        .scalar_subquery()
+    )
+    result = db.session.execute(
+        update(Movie)
+        .values(rating_sum=total, review_count=count, avg_rating=_average(total, count))
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount
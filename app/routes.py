@@ -8,11 +8,51 @@ from flask import request, make_response, session
 from flask_restful import Resource
 
 # Local imports
-from app import app, db, api, bcrypt
+from app import app, db, api
 from flask import render_template
 
 # Add your model imports
 from app.models import User, Movie, CartItem, Review, Artists, Albums, AlbumReviews
+from app.auth import current_user
+from app.cache import cached, conditional
+from app.cart_buffer import cart_buffer, flush_cart
+from app.carts import (
+    CartError,
+    add_many,
+    add_to_cart,
+    cart_summary,
+    lines_by_movie,
+    movie_ids_from,
+    remove_many,
+    user_cart,
+)
+from app.fields import FieldsError, requested_fields
+from app.filters import MOVIE_SORTABLE, FilterError, filter_cart_items, filter_movies
+from app.hashing import (
+    PoolBusy,
+    check_password,
+    hash_password,
+    hash_pool,
+    needs_rehash,
+)
+from app.ingest import IngestError, ingest_movies
+from app.loading import eager
+from app.serializers import serialize, serialize_all
+from app.provisioning import HashingUnavailable, ProvisionError, provision_users
+from app.profiles import build_profile, cached_profile, profile_tables, user_movies
+from app.projections import View, ViewError, projection, requested_view
+from app.ratings import review_added, review_changed, review_removed
+from app.pagination import (
+    DEFAULT_PAGE_SIZE,
+    PageError,
+    page_headers,
+    page_limit,
+    paginate,
+    parse_sort,
+)
+from app.sessions import active_sessions, revoke_user_sessions
+from app.streaming import stream_all, wants_stream
+from app.search import SEARCH_PAGE_SIZE, SearchUnavailable, search_movies
 
 
 # Views go here!
@@ -25,20 +65,25 @@ def index(id=0):
 
 class AllMovies(Resource):
 
+    @cached("movies", "reviews", "cart_items")
     def get(self):
-        movies = Movie.query.all()
-        body = [
-            movie.to_dict(
-                rules=(
-                    "-reviews.movie",
-                    "-reviews.user",
-                    "-cart_items.movie_cart",
-                    "-cart_items.user_cart",
-                )
+        rules = projection(Movie, "detail").rules
+        try:
+            fields = requested_fields(Movie, rules)
+            order, sort = parse_sort(request.args.get("sort"), MOVIE_SORTABLE, Movie.id)
+            # Sort keys must be loaded even when ?fields= leaves them out,
+            # the cursor is built from them.
+            load = fields and fields + tuple(
+                column.key for column, _ in order if column.key not in fields
             )
-            for movie in movies
-        ]
-        return make_response(body, 200)
+            query = filter_movies(Movie.query.options(*eager(Movie, rules, load)))
+            page = paginate(query, order, sort)
+        except (FieldsError, FilterError, PageError) as error:
+            body = {"error": str(error)}
+            return make_response(body, 400)
+
+        body = serialize_all(Movie, page.items, rules, fields)
+        return make_response(body, 200, page_headers(page))
 
     def post(self):
         try:
@@ -52,14 +97,7 @@ class AllMovies(Resource):
             )
             db.session.add(new_movie)
             db.session.commit()
-            body = new_movie.to_dict(
-                rules=(
-                    "-reviews.movie",
-                    "-reviews.user",
-                    "-cart_items.movie_cart",
-                    "-cart_items.user_cart",
-                )
-            )
+            body = serialize(new_movie, *projection(Movie, "detail"))
             return make_response(body, 201)
         except:
             body = {"error": "New movie could not be created."}
@@ -69,24 +107,73 @@ class AllMovies(Resource):
 api.add_resource(AllMovies, "/movies")
 
 
+class MovieSearch(Resource):
+
+    @cached("movies", "reviews", "cart_items")
+    def get(self):
+        q = request.args.get("q", "").strip()
+        if not q:
+            body = {"error": "Search query (q) is required."}
+            return make_response(body, 400)
+
+        rules = projection(Movie, "detail").rules
+        try:
+            fields = requested_fields(Movie, rules)
+            query, order, key = search_movies(q)
+            page = paginate(
+                query.options(*eager(Movie, rules, fields)),
+                order,
+                sort="search",
+                key=key,
+                default_limit=SEARCH_PAGE_SIZE,
+            )
+        except (FieldsError, PageError) as error:
+            body = {"error": str(error)}
+            return make_response(body, 400)
+        except SearchUnavailable as error:
+            body = {"error": str(error)}
+            return make_response(body, 501)
+
+        body = serialize_all(Movie, [row.Movie for row in page.items], rules, fields)
+        return make_response(body, 200, page_headers(page))
+
+
+api.add_resource(MovieSearch, "/movies/search")
+
+
+class MovieBulk(Resource):
+
+    def post(self):
+        on_conflict = request.args.get("on_conflict", "update")
+        if on_conflict not in ("update", "skip"):
+            body = {"error": "on_conflict must be update or skip."}
+            return make_response(body, 400)
+
+        try:
+            body = ingest_movies(request, upsert=on_conflict == "update")
+        except IngestError as error:
+            body = {"error": str(error)}
+            return make_response(body, 400)
+        return make_response(body, 201 if body["written"] else 400)
+
+
+api.add_resource(MovieBulk, "/movies/bulk")
+
+
 class MovieByID(Resource):
 
+    @cached("movies", "reviews", "cart_items", "users")
     def get(self, id):
+        try:
+            view = projection(User)
+        except ViewError as error:
+            body = {"error": str(error)}
+            return make_response(body, 400)
+
         movie = db.session.get(Movie, id)
         if movie:
-            body = movie.to_dict(
-                rules=(
-                    "-reviews.movie",
-                    "-reviews.user",
-                    "-cart_items.movie_cart",
-                    "-cart_items.user_cart",
-                )
-            )
-
-            body["users"] = [
-                user.to_dict(only=("id", "username")) for user in movie.users
-            ]
-
+            body = serialize(movie, *projection(Movie, "detail"))
+            body["users"] = [serialize(user, *view) for user in movie.users]
             return make_response(body, 200)
         else:
             body = {"error": f"Movie {id} not found."}
@@ -99,14 +186,7 @@ class MovieByID(Resource):
                 for attr in request.json:
                     setattr(movie, attr, request.json[attr])
                 db.session.commit()
-                body = movie.to_dict(
-                    rules=(
-                        "-reviews.movie",
-                        "-reviews.user",
-                        "-cart_items.movie_cart",
-                        "-cart_items.user_cart",
-                    )
-                )
+                body = serialize(movie, *projection(Movie, "detail"))
                 return make_response(body, 200)
             except:
                 body = {"error": "Movie could not be updated."}
@@ -134,20 +214,13 @@ api.add_resource(MovieByID, "/movies/<int:id>")
 
 class AllUsers(Resource):
 
+    @conditional("users", "reviews", "cart_items")
     def get(self):
-        users = User.query.all()
-        body = [
-            user.to_dict(
-                rules=(
-                    "-reviews.movie",
-                    "-reviews.user",
-                    "-cart_items.movie_cart",
-                    "-cart_items.user_cart",
-                    "-password_hash",
-                )
-            )
-            for user in users
-        ]
+        view = projection(User, "detail")
+        users = User.query.options(*eager(User, *view))
+        if wants_stream():
+            return stream_all(users, User, *view)
+        body = serialize_all(User, users.all(), *view)
         return make_response(body, 200)
 
     def post(self):
@@ -159,15 +232,7 @@ class AllUsers(Resource):
             )
             db.session.add(new_user)
             db.session.commit()
-            body = new_user.to_dict(
-                rules=(
-                    "-reviews.movie",
-                    "-reviews.user",
-                    "-cart_items.movie_cart",
-                    "-cart_items.user_cart",
-                    "-password_hash",
-                )
-            )
+            body = serialize(new_user, *projection(User, "detail"))
             return make_response(body, 201)
         except:
             body = {"error": "Could not create new user."}
@@ -177,39 +242,46 @@ class AllUsers(Resource):
 api.add_resource(AllUsers, "/users")
 
 
+class UserBulk(Resource):
+
+    def post(self):
+        if not (current_user and current_user.type == "admin"):
+            body = {"error": "Admins only."}
+            return make_response(body, 403)
+
+        try:
+            body = provision_users(request.get_json(silent=True))
+        except ProvisionError as error:
+            body = {"error": str(error)}
+            return make_response(body, 400)
+        except HashingUnavailable as error:
+            # Batches before the failure are committed; a retry reports them
+            # as taken.
+            body = {"error": str(error)}
+            return make_response(body, 503, {"Retry-After": "1"})
+        return make_response(body, 201 if body["created"] else 400)
+
+
+api.add_resource(UserBulk, "/users/bulk")
+
+
 class UserByID(Resource):
 
+    @conditional("users", "reviews", "cart_items", "movies")
     def get(self, id):
-        user = db.session.get(User, id)
-        if user:
-            try:
-                body = user.to_dict(
-                    rules=(
-                        "-reviews.movie",
-                        "-reviews.user",
-                        "-cart_items.movie_cart",
-                        "-cart_items.user_cart",
-                        "-password_hash",
-                    )
-                )
-
-                body["movies"] = [
-                    movie.to_dict(
-                        rules=(
-                            "-reviews.movie",
-                            "-reviews.user",
-                            "-cart_items.movie_cart",
-                            "-cart_items.user_cart",
-                            "-password_hash",
-                        )
-                    )
-                    for movie in user.movies
-                ]
+        try:
+            view = requested_view()
+        except ViewError as error:
+            body = {"error": str(error)}
+            return make_response(body, 400)
 
-                return make_response(body, 200)
-            except:
-                body = {"error": "User not found"}
-                return make_response(body, 404)
+        try:
+            body = cached_profile(id, view)
+        except:
+            body = {"error": "User not found"}
+            return make_response(body, 404)
+        if body:
+            return make_response(body, 200)
         else:
             body = {"error": f"User {id} was not found."}
             return make_response(body, 404)
@@ -218,6 +290,9 @@ class UserByID(Resource):
         user = db.session.get(User, id)
         if user:
             try:
+                # The user's reviews go with them, take them out of the movie ratings.
+                for review in user.reviews:
+                    review_removed(review)
                 db.session.delete(user)
                 db.session.commit()
                 body = {}
@@ -232,25 +307,48 @@ class UserByID(Resource):
 
 api.add_resource(UserByID, "/users/<int:id>")
 
+
+class UserMovies(Resource):
+
+    @cached("movies", "reviews", "cart_items", "users")
+    def get(self, id):
+        if db.session.get(User, id) is None:
+            body = {"error": f"User {id} was not found."}
+            return make_response(body, 404)
+        try:
+            view = projection(Movie)
+            fields = requested_fields(Movie, *view)
+            if fields:
+                # The cursor is built from id even when ?fields= leaves it out.
+                view = View(view.rules, tuple(dict.fromkeys(fields + ("id",))))
+            page = paginate(user_movies(id, view), [(Movie.id, False)])
+        except (ViewError, FieldsError, PageError) as error:
+            body = {"error": str(error)}
+            return make_response(body, 400)
+
+        body = serialize_all(Movie, page.items, view.rules, fields or view.only)
+        return make_response(body, 200, page_headers(page))
+
+
+api.add_resource(UserMovies, "/users/<int:id>/movies")
+
 # =================================================================================
 
 
 class AllReviews(Resource):
 
+    @conditional("reviews", "movies", "users")
     def get(self):
-        reviews = Review.query.all()
-        body = [
-            review.to_dict(
-                rules=(
-                    "-movie.reviews",
-                    "-user.reviews",
-                    "-user.cart_items",
-                    "-movie.cart_items",
-                    "-user.password_hash",
-                )
-            )
-            for review in reviews
-        ]
+        try:
+            view = projection(Review)
+        except ViewError as error:
+            body = {"error": str(error)}
+            return make_response(body, 400)
+
+        reviews = Review.query.options(*eager(Review, *view))
+        if wants_stream():
+            return stream_all(reviews, Review, *view)
+        body = serialize_all(Review, reviews.all(), *view)
         return make_response(body, 200)
 
     def post(self):
@@ -262,16 +360,9 @@ class AllReviews(Resource):
                 user_id=request.json.get("user_id"),
             )
             db.session.add(new_review)
+            review_added(new_review)
             db.session.commit()
-            body = new_review.to_dict(
-                rules=(
-                    "-movie.reviews",
-                    "-user.reviews",
-                    "-user.cart_items",
-                    "-movie.cart_items",
-                    "-user.password_hash",
-                )
-            )
+            body = serialize(new_review, *projection(Review, "summary"))
             return make_response(body, 201)
         except:
             body = {"error": "Review could not be created."}
@@ -283,20 +374,18 @@ api.add_resource(AllReviews, "/reviews")
 
 class ReviewByID(Resource):
 
+    @conditional("reviews", "movies", "users")
     def get(self, id):
-        pass
+        try:
+            view = projection(Review)
+        except ViewError as error:
+            body = {"error": str(error)}
+            return make_response(body, 400)
+
         review = db.session.get(Review, id)
         if review:
             try:
-                body = review.to_dict(
-                    rules=(
-                        "-movie.reviews",
-                        "-user.reviews",
-                        "-user.cart_items",
-                        "-movie.cart_items",
-                        "-user.password_hash",
-                    )
-                )
+                body = serialize(review, *view)
                 return make_response(body, 200)
             except:
                 body = {"error": "Could not fetch review at this moment."}
@@ -309,18 +398,12 @@ class ReviewByID(Resource):
         review = db.session.get(Review, id)
         if review:
             try:
+                old_movie_id, old_rating = review.movie_id, review.rating
                 for attr in request.json:
                     setattr(review, attr, request.json[attr])
+                review_changed(review, old_movie_id, old_rating)
                 db.session.commit()
-                body = review.to_dict(
-                    rules=(
-                        "-movie.reviews",
-                        "-user.reviews",
-                        "-user.cart_items",
-                        "-movie.cart_items",
-                        "-user.password_hash",
-                    )
-                )
+                body = serialize(review, *projection(Review, "summary"))
                 return make_response(body, 201)
             except:
                 body = {"error": "Review could not be updated."}
@@ -332,6 +415,7 @@ class ReviewByID(Resource):
     def delete(self, id):
         review = db.session.get(Review, id)
         if review:
+            review_removed(review)
             db.session.delete(review)
             db.session.commit()
             body = {}
@@ -346,37 +430,44 @@ api.add_resource(ReviewByID, "/reviews/<int:id>")
 
 class AllCartItems(Resource):
 
+    @conditional("cart_items", "movies", "users", per_user=True)
     def get(self):
-        user = User.query.filter(User.id == session.get("user_id")).first()
-
-        if user and user.type == "admin":
-            cart_items = CartItem.query.all()
-            body = [
-                cart_item.to_dict(
-                    rules=(
-                        "-movie_cart.cart_items",
-                        "-user_cart.cart_items",
-                        "-movie_cart.reviews",
-                        "-user_cart.reviews",
-                        "-user_cart.password_hash",
-                    )
+        try:
+            view = projection(CartItem)
+        except ViewError as error:
+            body = {"error": str(error)}
+            return make_response(body, 400)
+
+        if current_user and current_user.type == "admin":
+            # Everyone's cart lines: paged by default, ?stream=1 for all of them.
+            group_by = request.args.get("group_by")
+            try:
+                if group_by == "movie":
+                    limit = page_limit(DEFAULT_PAGE_SIZE)
+                    body = lines_by_movie(filter_cart_items, limit)
+                    return make_response(body, 200)
+                elif group_by:
+                    raise FilterError("group_by must be movie.")
+
+                cart_items = filter_cart_items(
+                    CartItem.query.options(*eager(CartItem, *view))
                 )
-                for cart_item in cart_items
-            ]
-            return make_response(body, 200)
-        elif user and user.type == "customer":
-            body = [
-                cart_item.to_dict(
-                    rules=(
-                        "-movie_cart.cart_items",
-                        "-user_cart.cart_items",
-                        "-movie_cart.reviews",
-                        "-user_cart.reviews",
-                        "-user_cart.password_hash",
-                    )
+                if wants_stream():
+                    return stream_all(cart_items, CartItem, *view)
+                page = paginate(
+                    cart_items,
+                    [(CartItem.id, False)],
+                    default_limit=DEFAULT_PAGE_SIZE,
                 )
-                for cart_item in list(set(user.cart_items))
-            ]
+            except (FilterError, PageError) as error:
+                body = {"error": str(error)}
+                return make_response(body, 400)
+
+            body = serialize_all(CartItem, page.items, *view)
+            return make_response(body, 200, page_headers(page))
+        elif current_user and current_user.type == "customer":
+            cart_items = user_cart(current_user.id, view).all()
+            body = serialize_all(CartItem, cart_items, *view)
             return make_response(body, 200)
         else:
             body = {"error": "Something went wrong..."}
@@ -384,21 +475,19 @@ class AllCartItems(Resource):
 
     def post(self):
         try:
-            new_cart_item = CartItem(
-                movie_id=request.json.get("movie_id"),
-                user_id=request.json.get("user_id"),
-            )
-            db.session.add(new_cart_item)
+            user_id = request.json.get("user_id")
+            movie_id = request.json.get("movie_id")
+            quantity = request.json.get("quantity", 1)
+            if cart_buffer is not None:
+                # Written behind: there is no cart line id to return yet.
+                cart_buffer.add(user_id, movie_id, quantity)
+                body = {"user_id": user_id, "movie_id": movie_id, "quantity": quantity}
+                return make_response(body, 202)
+
+            cart_item_id = add_to_cart(user_id, movie_id, quantity)
             db.session.commit()
-            body = new_cart_item.to_dict(
-                rules=(
-                    "-movie_cart.cart_items",
-                    "-user_cart.cart_items",
-                    "-movie_cart.reviews",
-                    "-user_cart.reviews",
-                    "-user_cart.password_hash",
-                )
-            )
+            cart_item = db.session.get(CartItem, cart_item_id, populate_existing=True)
+            body = serialize(cart_item, *projection(CartItem, "summary"))
             return make_response(body, 201)
         except:
             body = {"error": "Could not add item to cart."}
@@ -408,21 +497,82 @@ class AllCartItems(Resource):
 api.add_resource(AllCartItems, "/cart_items")
 
 
+class CartSummary(Resource):
+
+    # Per-user versions change on every write to this user's cart.
+    @cached("movies", per_user=True)
+    def get(self):
+        if current_user:
+            body = cart_summary(current_user.id)
+            return make_response(body, 200)
+        else:
+            body = {"error": "Please LogIn!"}
+            return make_response(body, 401)
+
+
+api.add_resource(CartSummary, "/cart_items/summary")
+
+
+class CartItemsBatch(Resource):
+    # {"movie_ids": [...]} for the signed-in user's cart; one statement and
+    # one commit per request, answered with what changed and the new totals.
+
+    def post(self):
+        if not current_user:
+            body = {"error": "Please LogIn!"}
+            return make_response(body, 401)
+        try:
+            movie_ids = movie_ids_from(request.get_json(silent=True))
+            flush_cart(current_user.id)
+            added, missing = add_many(current_user.id, movie_ids)
+            db.session.commit()
+        except CartError as error:
+            db.session.rollback()
+            body = {"error": str(error)}
+            return make_response(body, 400)
+
+        body = {
+            "added": added,
+            "missing": missing,
+            "cart": cart_summary(current_user.id),
+        }
+        return make_response(body, 200)
+
+    def delete(self):
+        if not current_user:
+            body = {"error": "Please LogIn!"}
+            return make_response(body, 401)
+        try:
+            movie_ids = movie_ids_from(request.get_json(silent=True))
+            flush_cart(current_user.id)
+            removed = remove_many(current_user.id, movie_ids)
+            db.session.commit()
+        except CartError as error:
+            db.session.rollback()
+            body = {"error": str(error)}
+            return make_response(body, 400)
+
+        body = {"removed": removed, "cart": cart_summary(current_user.id)}
+        return make_response(body, 200)
+
+
+api.add_resource(CartItemsBatch, "/cart_items/batch")
+
+
 class CartItemsByID(Resource):
 
+    @conditional("cart_items", "movies", "users")
     def get(self, id):
+        try:
+            view = projection(CartItem)
+        except ViewError as error:
+            body = {"error": str(error)}
+            return make_response(body, 400)
+
         cart_item = db.session.get(CartItem, id)
         if cart_item:
             try:
-                body = cart_item.to_dict(
-                    rules=(
-                        "-movie_cart.cart_items",
-                        "-user_cart.cart_items",
-                        "-movie_cart.reviews",
-                        "-user_cart.reviews",
-                        "-user_cart.password_hash",
-                    )
-                )
+                body = serialize(cart_item, *view)
                 return make_response(body, 200)
             except:
                 body = {"error": "Could not process request."}
@@ -434,8 +584,11 @@ class CartItemsByID(Resource):
     def delete(self, id):
         cart_item = db.session.get(CartItem, id)
         if cart_item:
-            db.session.delete(cart_item)
-            db.session.commit()
+            if cart_buffer is not None:
+                cart_buffer.remove(cart_item.user_id, cart_item.movie_id)
+            else:
+                db.session.delete(cart_item)
+                db.session.commit()
             body = {}
             return make_response(body, 204)
         else:
@@ -452,33 +605,27 @@ class Login(Resource):
         password = request.json.get("password_hash")
         current_user = User.query.filter(User.username == username).first()
 
-        if current_user and bcrypt.check_password_hash(
-            current_user.password_hash, password
-        ):
-            session["user_id"] = current_user.id
-            body = current_user.to_dict(
-                rules=(
-                    "-reviews.movie",
-                    "-reviews.user",
-                    "-cart_items.movie_cart",
-                    "-cart_items.user_cart",
-                    "-password_hash",
-                )
+        try:
+            valid = current_user and check_password(
+                current_user.password_hash, password
             )
+        except PoolBusy as error:
+            body = {"error": str(error)}
+            return make_response(body, 503, {"Retry-After": "1"})
+
+        if valid:
+            if needs_rehash(current_user.password_hash):
+                # Move the stored hash to the configured cost while we have
+                # the plaintext; on a busy pool just try again next login.
+                try:
+                    current_user.password_hash = hash_password(password)
+                    db.session.commit()
+                except PoolBusy:
+                    pass
 
-            body["movies"] = [
-                movie.to_dict(
-                    rules=(
-                        "-reviews.movie",
-                        "-reviews.user",
-                        "-cart_items.movie_cart",
-                        "-cart_items.user_cart",
-                        "-password_hash",
-                    )
-                )
-                for movie in list(set(current_user.movies))
-            ]
-
+            session["user_id"] = current_user.id
+            flush_cart(current_user.id)
+            body = cached_profile(current_user.id)
             return make_response(body, 200)
         else:
             body = {"error": "Invalid Username or Password."}
@@ -490,32 +637,18 @@ api.add_resource(Login, "/login")
 
 class CheckSession(Resource):
 
+    # ?view=detail nests other users' reviews and cart items; the default
+    # view only changes with the movies and the user's own writes.
+    @conditional(lambda: profile_tables(request.args.get("view")), per_user=True)
     def get(self):
-        current_user = db.session.get(User, session.get("user_id"))
-        if current_user:
-            body = current_user.to_dict(
-                rules=(
-                    "-reviews.movie",
-                    "-reviews.user",
-                    "-cart_items.movie_cart",
-                    "-cart_items.user_cart",
-                    "-password_hash",
-                )
-            )
-
-            body["movies"] = [
-                movie.to_dict(
-                    rules=(
-                        "-reviews.movie",
-                        "-reviews.user",
-                        "-cart_items.movie_cart",
-                        "-cart_items.user_cart",
-                        "-password_hash",
-                    )
-                )
-                for movie in list(set(current_user.movies))
-            ]
+        try:
+            view = requested_view()
+        except ViewError as error:
+            body = {"error": str(error)}
+            return make_response(body, 400)
 
+        body = cached_profile(current_user.id, view) if current_user else None
+        if body:
             return make_response(body, 200)
         else:
             body = {"error": "Please LogIn!"}
@@ -528,8 +661,13 @@ api.add_resource(CheckSession, "/check_session")
 class Logout(Resource):
 
     def delete(self):
-        if session.get("user_id"):
+        user_id = session.get("user_id")
+        if user_id:
             del session["user_id"]
+            # ?everywhere=1 also ends the user's other sessions (server-side
+            # sessions only).
+            if request.args.get("everywhere"):
+                revoke_user_sessions(user_id)
 
         body = {}
         return make_response(body, 204)
@@ -543,7 +681,7 @@ class Signup(Resource):
     def post(self):
         try:
             password = request.json.get("password_hash")
-            pw_hash = bcrypt.generate_password_hash(password).decode("utf-8")
+            pw_hash = hash_password(password)
             new_user = User(
                 username=request.json.get("username"),
                 password_hash=pw_hash,
@@ -553,30 +691,11 @@ class Signup(Resource):
             db.session.commit()
             session["user_id"] = new_user.id
 
-            body = new_user.to_dict(
-                rules=(
-                    "-reviews.movie",
-                    "-reviews.user",
-                    "-cart_items.movie_cart",
-                    "-cart_items.user_cart",
-                    "-password_hash",
-                )
-            )
-
-            body["movies"] = [
-                movie.to_dict(
-                    rules=(
-                        "-reviews.movie",
-                        "-reviews.user",
-                        "-cart_items.movie_cart",
-                        "-cart_items.user_cart",
-                        "-password_hash",
-                    )
-                )
-                for movie in new_user.movies
-            ]
-
+            body = build_profile(new_user)
             return make_response(body, 201)
+        except PoolBusy as error:
+            body = {"error": str(error)}
+            return make_response(body, 503, {"Retry-After": "1"})
         except:
             body = {"error": "Could not create new user."}
             return make_response(body, 400)
@@ -584,14 +703,38 @@ class Signup(Resource):
 
 api.add_resource(Signup, "/signup")
 
+
+class AuthMetrics(Resource):
+
+    def get(self):
+        if current_user and current_user.type == "admin":
+            body = hash_pool.stats()
+            sessions = active_sessions()
+            if sessions is not None:
+                body["active_sessions"] = sessions
+            return make_response(body, 200)
+        else:
+            body = {"error": "Admins only."}
+            return make_response(body, 403)
+
+
+api.add_resource(AuthMetrics, "/auth/metrics")
+
 # ------------------------------------------------------------------------
 
 
 class AllArtists(Resource):
+    @cached("artists")
     def get(self):
-        artists = Artists.query.all()
+        rules = projection(Artists, "detail").rules
+        try:
+            fields = requested_fields(Artists, rules)
+        except FieldsError as error:
+            body = {"error": str(error)}
+            return make_response(body, 400)
 
-        body = [artist.to_dict(rules=("-artist_reviews",)) for artist in artists]
+        artists = Artists.query.options(*eager(Artists, rules, fields)).all()
+        body = serialize_all(Artists, artists, rules, fields)
         return make_response(body, 200)
 
     def post(self):
@@ -602,7 +745,7 @@ class AllArtists(Resource):
             db.session.add(new_artist)
             db.session.commit()
 
-            body = new_artist.to_dict(rules=("-artist_reviews",))
+            body = serialize(new_artist, *projection(Artists, "detail"))
             return make_response(body, 201)
         except:
             body = {
@@ -616,13 +759,19 @@ api.add_resource(AllArtists, "/artists")
 
 class ArtistByID(Resource):
 
+    @conditional("artists", "albums", "albumreviews")
     def get(self, id):
+        try:
+            view = projection(Albums)
+        except ViewError as error:
+            body = {"error": str(error)}
+            return make_response(body, 400)
+
         artist = db.session.get(Artists, id)
         if artist:
-            body = artist.to_dict(rules=("-artist_reviews",))
+            body = serialize(artist, *projection(Artists, "detail"))
             body["album_association"] = [
-                album.to_dict(rules=("-album_reviews",))
-                for album in artist.album_association
+                serialize(album, *view) for album in artist.album_association
             ]
             return make_response(body, 200)
         else:
@@ -636,7 +785,7 @@ class ArtistByID(Resource):
                 for attr in request.json:
                     setattr(artist, attr, request.json[attr])
                 db.session.commit()
-                body = artist.to_dict(rules=("-artist_reviews",))
+                body = serialize(artist, *projection(Artists, "detail"))
                 return make_response(body, 201)
             except:
                 body = {"error": "Artist could not be updated."}
@@ -661,9 +810,17 @@ api.add_resource(ArtistByID, "/artists/<int:id>")
 
 class AllAlbums(Resource):
 
+    @cached("albums")
     def get(self):
-        albums = Albums.query.all()
-        body = [album.to_dict(rules=("-album_reviews",)) for album in albums]
+        rules = projection(Albums, "detail").rules
+        try:
+            fields = requested_fields(Albums, rules)
+        except FieldsError as error:
+            body = {"error": str(error)}
+            return make_response(body, 400)
+
+        albums = Albums.query.options(*eager(Albums, rules, fields)).all()
+        body = serialize_all(Albums, albums, rules, fields)
         return make_response(body, 200)
 
     def post(self):
@@ -677,7 +834,7 @@ class AllAlbums(Resource):
             )
             db.session.add(new_album)
             db.session.commit()
-            body = new_album.to_dict(rules=("-album_reviews",))
+            body = serialize(new_album, *projection(Albums, "detail"))
             return make_response(body, 201)
         except:
             body = {"error": "Album could not be created at this time."}
@@ -689,18 +846,22 @@ api.add_resource(AllAlbums, "/albums")
 
 class AlbumByID(Resource):
 
+    @conditional("albums", "artists", "albumreviews")
     def get(self, id):
+        try:
+            view = projection(Artists)
+        except ViewError as error:
+            body = {"error": str(error)}
+            return make_response(body, 400)
+
         album = db.session.get(Albums, id)
         if album:
             try:
-                body = album.to_dict(rules=("-album_reviews",))
+                body = serialize(album, *projection(Albums, "detail"))
                 body["artist_association"] = [
-                    artist.to_dict(
-                        rules=("-artist_reviews",),
-                    )
-                    for artist in album.artist_association
+                    serialize(artist, *view) for artist in album.artist_association
                 ]
-                return make_response(body, 201)
+                return make_response(body, 200)
             except:
                 body = {"error": "Album could not be found."}
                 return make_response(body, 400)
@@ -715,7 +876,7 @@ class AlbumByID(Resource):
                 for attr in request.json:
                     setattr(album, attr, request.json[attr])
                 db.session.commit()
-                body = album.to_dict(rules=("-album_reviews",))
+                body = serialize(album, *projection(Albums, "detail"))
                 return make_response(body, 201)
             except:
                 body = {"error": "Album could not be updated."}
@@ -741,13 +902,17 @@ api.add_resource(AlbumByID, "/albums/<int:id>")
 
 class AllAlbumReviews(Resource):
 
+    @conditional("albumreviews", "albums", "artists")
     def get(self):
-        reviews = AlbumReviews.query.all()
         try:
-            body = [
-                review.to_dict(rules=("-artist.artist_reviews", "-album.album_reviews"))
-                for review in reviews
-            ]
+            view = projection(AlbumReviews)
+        except ViewError as error:
+            body = {"error": str(error)}
+            return make_response(body, 400)
+
+        reviews = AlbumReviews.query.options(*eager(AlbumReviews, *view)).all()
+        try:
+            body = serialize_all(AlbumReviews, reviews, *view)
             return make_response(body, 200)
         except:
             body = {"error": "Album Reviews could not be found"}
@@ -763,9 +928,7 @@ class AllAlbumReviews(Resource):
             )
             db.session.add(new_review)
             db.session.commit()
-            body = new_review.to_dict(
-                rules=("-artist.artist_reviews", "-album.album_reviews")
-            )
+            body = serialize(new_review, *projection(AlbumReviews, "summary"))
             return make_response(body, 201)
         except:
             body = {"Error": "Review could not be made."}
@@ -777,13 +940,18 @@ api.add_resource(AllAlbumReviews, "/albumreviews")
 
 class AlbumReviewByID(Resource):
 
+    @conditional("albumreviews", "albums", "artists")
     def get(self, id):
+        try:
+            view = projection(AlbumReviews)
+        except ViewError as error:
+            body = {"error": str(error)}
+            return make_response(body, 400)
+
         review = db.session.get(AlbumReviews, id)
         if review:
             try:
-                body = review.to_dict(
-                    rules=("-album.album_reviews", "-artist.artist_reviews")
-                )
+                body = serialize(review, *view)
                 return make_response(body, 200)
             except:
                 body = {"error": "Reviews could not be found"}
@@ -799,9 +967,7 @@ class AlbumReviewByID(Resource):
                 for attr in request.json:
                     setattr(review, attr, request.json[attr])
                 db.session.commit()
-                body = review.to_dict(
-                    rules=("-album.album_reviews", "-artist.artist_reviews")
-                )
+                body = serialize(review, *projection(AlbumReviews, "summary"))
                 return make_response(body, 201)
             except:
                 body = {"error": "Review could not be updated."}
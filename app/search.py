@@ -0,0 +1,65 @@
+import re
+
+from sqlalchemy import Float, cast, column, false, func, literal_column, table
+
+from app import db
+from app.models import Movie
+
+# Full-text search over movie name, director and description.
+#
+# Postgres matches against the generated, GIN-indexed ``movies.search_vector``
+# column; SQLite matches against the ``movies_fts`` FTS5 table. Both are
+# created by migration 248141b7f70c and are deliberately not mapped on Movie.
+
+SEARCH_PAGE_SIZE = 20
+
+movies_fts = table("movies_fts", column("rowid"))
+
+
+class SearchUnavailable(RuntimeError):
+    pass
+
+
+def _fts5_query(q):
+    # Quote every term so user input can't inject FTS5 syntax; the last term
+    # is matched as a prefix for search-as-you-type.
+    terms = re.findall(r"\w+", q)
+    if not terms:
+        return None
+    quoted = ['"%s"' % term for term in terms]
+    quoted[-1] += "*"
+    return " ".join(quoted)
+
+
+def search_movies(q):
+    # Returns (query of (Movie, rank) rows, keyset order, row key).
+    dialect = db.session.get_bind().dialect.name
+
+    if dialect == "postgresql":
+        vector = literal_column("movies.search_vector")
+        tsquery = func.websearch_to_tsquery("english", q)
+        # ts_rank_cd() is a real; as one, it would never equal the double the
+        # cursor carries back, and ties at a page boundary would be lost.
+        rank = cast(func.ts_rank_cd(vector, tsquery), Float)
+        query = db.session.query(Movie, rank.label("rank")).filter(
+            vector.op("@@")(tsquery)
+        )
+        order = [(rank, True), (Movie.id, False)]
+
+    elif dialect == "sqlite":
+        match = _fts5_query(q)
+        # bm25() scores are negative; the best match is the smallest.
+        rank = func.bm25(literal_column("movies_fts"), 10.0, 5.0, 1.0)
+        query = db.session.query(Movie, rank.label("rank")).join(
+            movies_fts, movies_fts.c.rowid == Movie.id
+        )
+        if match:
+            query = query.filter(literal_column("movies_fts").op("MATCH")(match))
+        else:
+            query = query.filter(false())
+        order = [(rank, False), (Movie.id, False)]
+
+    else:
+        raise SearchUnavailable(f"Search is not supported on {dialect}.")
+
+    return query, order, lambda row: (row.rank, row.Movie.id)
@@ -6,6 +6,7 @@ from random import randint, choice as rc
 # Local imports
 from app import app, bcrypt
 from app.models import db, Movie, User, Review, CartItem
+from app.ratings import recompute_ratings
 
 if __name__ == "__main__":
 
@@ -81,4 +82,8 @@ if __name__ == "__main__":
         db.session.add_all([review1, review2, review3])
         db.session.commit()
 
+        # Reviews were inserted directly, rebuild the movie rating aggregates.
+        recompute_ratings()
+        db.session.commit()
+
         print("🌱 Database successfully seeded! 🌱")
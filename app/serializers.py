@@ -0,0 +1,89 @@
+from datetime import date, datetime, time
+from decimal import Decimal
+from functools import lru_cache
+from operator import attrgetter
+
+from sqlalchemy import inspect
+from sqlalchemy_serializer import SerializerMixin
+
+from app.loading import build_plan
+
+# Compiled serializers.
+#
+# SerializerMixin.to_dict re-parses its rules and inspects every attribute of
+# every row on each call. Here a (model, rules, only) triple is compiled once
+# into a closure that reads a fixed list of attributes and recurses only into
+# the relationships the rules keep, producing the same dicts as to_dict.
+
+
+def _converter(model, key):
+    column = inspect(model).columns.get(key)
+    try:
+        python_type = column.type.python_type
+    except (AttributeError, NotImplementedError):
+        return None
+
+    # Same string formats SerializerMixin uses for non-JSON types.
+    if issubclass(python_type, datetime):
+        fmt = SerializerMixin.datetime_format
+        return lambda value: value.strftime(fmt)
+    if issubclass(python_type, date):
+        fmt = SerializerMixin.date_format
+        return lambda value: value.strftime(fmt)
+    if issubclass(python_type, time):
+        fmt = SerializerMixin.time_format
+        return lambda value: value.strftime(fmt)
+    if issubclass(python_type, Decimal):
+        fmt = SerializerMixin.decimal_format
+        return lambda value: fmt.format(value)
+    return None
+
+
+def _compile(plan):
+    keys = plan.columns
+    getter = attrgetter(*keys) if len(keys) > 1 else None
+    converters = [
+        (key, convert)
+        for key in keys
+        if (convert := _converter(plan.model, key)) is not None
+    ]
+    relations = [
+        (key, prop.uselist, _compile(child))
+        for key, (prop, child) in plan.relations.items()
+    ]
+
+    def serialize(obj):
+        if getter is not None:
+            body = dict(zip(keys, getter(obj)))
+        else:
+            body = {key: getattr(obj, key) for key in keys}
+        for key, convert in converters:
+            if body[key] is not None:
+                body[key] = convert(body[key])
+        for key, uselist, nested in relations:
+            value = getattr(obj, key)
+            if uselist:
+                body[key] = [nested(item) for item in value]
+            else:
+                body[key] = nested(value) if value is not None else None
+        return body
+
+    return serialize
+
+
+@lru_cache(maxsize=None)
+def _cached_serializer(model, rules, only):
+    return _compile(build_plan(model, rules, only))
+
+
+def serializer(model, rules=(), only=()):
+    return _cached_serializer(model, tuple(rules), tuple(only))
+
+
+def serialize(obj, rules=(), only=()):
+    return serializer(type(obj), rules, only)(obj)
+
+
+def serialize_all(model, rows, rules=(), only=()):
+    dump = serializer(model, rules, only)
+    return [dump(row) for row in rows]
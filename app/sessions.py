@@ -0,0 +1,258 @@
+import atexit
+import json
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from flask.sessions import SessionInterface, SessionMixin
+from sqlalchemy import bindparam, delete, func, select, update
+from werkzeug.datastructures import CallbackDict
+
+from app import app, db
+from app.models import UserSession
+
+# Server-side sessions (SESSION_BACKEND=memory|sql).
+#
+# The cookie carries only a random session id; the session data lives in an
+# in-process LRU ("memory", single node) or in the user_sessions table ("sql",
+# shared by every node). A session idles out permanent_session_lifetime after
+# it was last seen. Reads don't rewrite the row: last-seen updates are queued
+# and written in one batch every SESSION_TOUCH_INTERVAL seconds or
+# SESSION_TOUCH_BATCH sessions. Sessions are indexed by user so Logout can end
+# all of a user's sessions and admins can count active ones.
+#
+# SESSION_BACKEND=cookie (the default) keeps Flask's signed-cookie sessions.
+
+
+class ServerSession(CallbackDict, SessionMixin):
+    def __init__(self, sid, data=None, new=True):
+        def on_update(self):
+            self.modified = True
+
+        super().__init__(data, on_update)
+        self.sid = sid
+        self.new = new
+        self.modified = False
+        self.user_id = (data or {}).get("user_id")
+
+
+class MemoryStore:
+    def __init__(self, lifetime, max_entries=10000):
+        self.lifetime = lifetime
+        self.max_entries = max_entries
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def load(self, sid):
+        with self._lock:
+            entry = self._sessions.get(sid)
+            if entry is None:
+                return None
+            data, user_id, last_seen = entry
+            if last_seen + self.lifetime < time.time():
+                del self._sessions[sid]
+                return None
+            self._sessions.move_to_end(sid)
+            return data
+
+    def save(self, sid, data, user_id):
+        with self._lock:
+            self._sessions[sid] = (data, user_id, time.time())
+            self._sessions.move_to_end(sid)
+            while len(self._sessions) > self.max_entries:
+                self._sessions.popitem(last=False)
+
+    def touch(self, sid):
+        with self._lock:
+            entry = self._sessions.get(sid)
+            if entry is not None:
+                self._sessions[sid] = entry[:2] + (time.time(),)
+
+    def delete(self, sid):
+        with self._lock:
+            self._sessions.pop(sid, None)
+
+    def revoke_user(self, user_id):
+        with self._lock:
+            sids = [sid for sid, entry in self._sessions.items() if entry[1] == user_id]
+            for sid in sids:
+                del self._sessions[sid]
+        return len(sids)
+
+    def count_active(self):
+        cutoff = time.time() - self.lifetime
+        with self._lock:
+            return sum(1 for entry in self._sessions.values() if entry[2] >= cutoff)
+
+    def flush(self):
+        pass
+
+
+class SqlStore:
+    # Uses its own connections so session writes never mix with the request's
+    # transaction (or bump response cache versions).
+    def __init__(self, lifetime, touch_interval=60, touch_batch=100):
+        self.lifetime = lifetime
+        self.touch_interval = touch_interval
+        self.touch_batch = touch_batch
+        self._touched = {}
+        self._flushed = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _cutoff(self):
+        return datetime.utcnow() - timedelta(seconds=self.lifetime)
+
+    def load(self, sid):
+        table = UserSession.__table__
+        with db.engine.connect() as conn:
+            row = conn.execute(
+                select(table.c.data).where(
+                    table.c.id == sid, table.c.last_seen >= self._cutoff()
+                )
+            ).first()
+        return None if row is None else json.loads(row.data)
+
+    def save(self, sid, data, user_id):
+        table = UserSession.__table__
+        now = datetime.utcnow()
+        values = {"user_id": user_id, "data": json.dumps(data), "last_seen": now}
+        with db.engine.begin() as conn:
+            result = conn.execute(
+                update(table).where(table.c.id == sid).values(**values)
+            )
+            if result.rowcount == 0:
+                conn.execute(table.insert().values(id=sid, created_at=now, **values))
+        with self._lock:
+            self._touched.pop(sid, None)
+
+    def touch(self, sid):
+        with self._lock:
+            self._touched[sid] = datetime.utcnow()
+            due = (
+                len(self._touched) >= self.touch_batch
+                or time.monotonic() - self._flushed >= self.touch_interval
+            )
+        if due:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            touched, self._touched = self._touched, {}
+            self._flushed = time.monotonic()
+        table = UserSession.__table__
+        with db.engine.begin() as conn:
+            if touched:
+                conn.execute(
+                    update(table)
+                    .where(table.c.id == bindparam("sid"))
+                    .values(last_seen=bindparam("seen")),
+                    [{"sid": sid, "seen": seen} for sid, seen in touched.items()],
+                )
+            conn.execute(delete(table).where(table.c.last_seen < self._cutoff()))
+
+    def delete(self, sid):
+        table = UserSession.__table__
+        with db.engine.begin() as conn:
+            conn.execute(delete(table).where(table.c.id == sid))
+
+    def revoke_user(self, user_id):
+        table = UserSession.__table__
+        with db.engine.begin() as conn:
+            result = conn.execute(delete(table).where(table.c.user_id == user_id))
+        return result.rowcount
+
+    def count_active(self):
+        table = UserSession.__table__
+        with db.engine.connect() as conn:
+            return conn.execute(
+                select(func.count())
+                .select_from(table)
+                .where(table.c.last_seen >= self._cutoff())
+            ).scalar()
+
+
+class ServerSessionInterface(SessionInterface):
+    def __init__(self, store):
+        self.store = store
+
+    def open_session(self, app, request):
+        sid = request.cookies.get(self.get_cookie_name(app))
+        if sid:
+            data = self.store.load(sid)
+            if data is not None:
+                return ServerSession(sid, data, new=False)
+        return ServerSession(secrets.token_urlsafe(32))
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+
+        if not session:
+            if not session.new:
+                self.store.delete(session.sid)
+            if session.modified or not session.new:
+                response.delete_cookie(name, domain=domain, path=path)
+            return
+
+        if not session.modified:
+            if not session.new:
+                self.store.touch(session.sid)
+            return
+
+        user_id = session.get("user_id")
+        if not session.new and user_id != session.user_id:
+            # Signing in (or switching users) gets a fresh id.
+            self.store.delete(session.sid)
+            session.sid = secrets.token_urlsafe(32)
+        self.store.save(session.sid, dict(session), user_id)
+        response.set_cookie(
+            name,
+            session.sid,
+            expires=self.get_expiration_time(app, session),
+            httponly=self.get_cookie_httponly(app),
+            domain=domain,
+            path=path,
+            secure=self.get_cookie_secure(app),
+            samesite=self.get_cookie_samesite(app),
+        )
+        response.vary.add("Cookie")
+
+
+def make_store(config, lifetime):
+    backend = config.get("SESSION_BACKEND", "cookie")
+    if backend == "memory":
+        return MemoryStore(lifetime, config.get("SESSION_MAX_ENTRIES", 10000))
+    if backend == "sql":
+        return SqlStore(
+            lifetime,
+            touch_interval=config.get("SESSION_TOUCH_INTERVAL", 60),
+            touch_batch=config.get("SESSION_TOUCH_BATCH", 100),
+        )
+    return None
+
+
+session_store = make_store(app.config, app.permanent_session_lifetime.total_seconds())
+
+if session_store is not None:
+    app.session_interface = ServerSessionInterface(session_store)
+
+    @atexit.register
+    def _flush_touches():
+        with app.app_context():
+            session_store.flush()
+
+
+def revoke_user_sessions(user_id):
+    # Ends every session of the user on every node; None with cookie sessions.
+    if session_store is None:
+        return None
+    return session_store.revoke_user(user_id)
+
+
+def active_sessions():
+    if session_store is None:
+        return None
+    return session_store.count_active()
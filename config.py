@@ -1,7 +1,6 @@
 import os
 from dotenv import load_dotenv
 
-
 # Load environment variables from .env file
 load_dotenv()
 
@@ -10,3 +9,50 @@ class Config:
     SECRET_KEY = os.getenv("SECRET_KEY").encode("utf-8", "ignore")
     SQLALCHEMY_DATABASE_URI = os.getenv("DATABASE_URL")
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    # Response cache, off ("null") unless enabled: "redis" is shared by every
+    # process (needs the redis package); "memory" is per process and only
+    # sees that process's writes, so use it with a single process. CACHE_TTL=0
+    # disables caching too. Responses over CACHE_MAX_ENTRY_BYTES aren't
+    # cached, and the memory backend holds at most CACHE_MAX_BYTES.
+    CACHE_BACKEND = os.getenv("CACHE_BACKEND", "null")
+    CACHE_REDIS_URL = os.getenv("CACHE_REDIS_URL", "redis://localhost:6379/0")
+    CACHE_TTL = int(os.getenv("CACHE_TTL", "60"))
+    CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "1024"))
+    CACHE_MAX_BYTES = int(os.getenv("CACHE_MAX_BYTES", str(64 << 20)))
+    CACHE_MAX_ENTRY_BYTES = int(os.getenv("CACHE_MAX_ENTRY_BYTES", str(1 << 20)))
+
+    # Session storage: "cookie" (Flask's signed cookie), "memory" (per
+    # process) or "sql" (user_sessions table). Server-side sessions idle out
+    # after PERMANENT_SESSION_LIFETIME; last-seen times are written in
+    # batches of SESSION_TOUCH_BATCH or every SESSION_TOUCH_INTERVAL seconds.
+    SESSION_BACKEND = os.getenv("SESSION_BACKEND", "cookie")
+    SESSION_MAX_ENTRIES = int(os.getenv("SESSION_MAX_ENTRIES", "10000"))
+    SESSION_TOUCH_INTERVAL = int(os.getenv("SESSION_TOUCH_INTERVAL", "60"))
+    SESSION_TOUCH_BATCH = int(os.getenv("SESSION_TOUCH_BATCH", "100"))
+
+    # Seconds a user's id -> (username, type) lookup is reused in-process
+    # when CACHE_BACKEND=redis; 0 (or any other backend) resolves the user
+    # from the database on every request.
+    IDENTITY_CACHE_TTL = int(os.getenv("IDENTITY_CACHE_TTL", "30"))
+
+    # Write-behind cart changes (see app/cart_buffer.py): pending changes are
+    # written every CART_FLUSH_INTERVAL seconds or once CART_FLUSH_SIZE cart
+    # lines are pending.
+    CART_WRITE_BEHIND = os.getenv("CART_WRITE_BEHIND", "0").lower() in ("1", "true")
+    CART_FLUSH_INTERVAL = float(os.getenv("CART_FLUSH_INTERVAL", "1"))
+    CART_FLUSH_SIZE = int(os.getenv("CART_FLUSH_SIZE", "500"))
+
+    # bcrypt work factor; measure with `flask bcrypt-calibrate`. Stored
+    # hashes with another cost are rehashed on the next successful login.
+    BCRYPT_LOG_ROUNDS = int(os.getenv("BCRYPT_LOG_ROUNDS", "12"))
+
+    # Password hashing pool: worker threads (defaults to the CPU count),
+    # extra requests allowed to wait, and seconds to wait before a 503.
+    BCRYPT_POOL_WORKERS = int(os.getenv("BCRYPT_POOL_WORKERS", "0"))
+    BCRYPT_POOL_QUEUE = int(os.getenv("BCRYPT_POOL_QUEUE", "32"))
+    BCRYPT_POOL_TIMEOUT = float(os.getenv("BCRYPT_POOL_TIMEOUT", "5"))
+
+    # Worker processes hashing passwords for POST /users/bulk (defaults to
+    # the CPU count).
+    BCRYPT_BULK_WORKERS = int(os.getenv("BCRYPT_BULK_WORKERS", "0"))
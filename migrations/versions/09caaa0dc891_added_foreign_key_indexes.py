@@ -0,0 +1,52 @@
+"""Added foreign key indexes
+
+Revision ID: 09caaa0dc891
+Revises: 6357a76ea1e2
+Create Date: 2026-10-18 14:21:36.580914
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '09caaa0dc891'
+down_revision = '6357a76ea1e2'
+branch_labels = None
+depends_on = None
+
+
+# cart_items.user_id and reviews.user_id are already the leading column of
+# uq_cart_items_user_id_movie_id and ix_reviews_user_id_movie_id.
+INDEXES = [
+    ('albumreviews', 'ix_albumreviews_album_id', ['album_id']),
+    ('albumreviews', 'ix_albumreviews_artist_id', ['artist_id']),
+    ('cart_items', 'ix_cart_items_movie_id', ['movie_id']),
+    ('reviews', 'ix_reviews_movie_id', ['movie_id']),
+]
+
+
+def upgrade():
+    if op.get_context().dialect.name == 'postgresql':
+        # CONCURRENTLY keeps the tables writable while the indexes build; it
+        # can't run inside the migration transaction.
+        with op.get_context().autocommit_block():
+            for table, name, columns in INDEXES:
+                op.create_index(name, table, columns, unique=False, postgresql_concurrently=True, if_not_exists=True)
+        return
+
+    for table, name, columns in INDEXES:
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.create_index(name, columns, unique=False)
+
+
+def downgrade():
+    if op.get_context().dialect.name == 'postgresql':
+        with op.get_context().autocommit_block():
+            for table, name, columns in reversed(INDEXES):
+                op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
+        return
+
+    for table, name, columns in reversed(INDEXES):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_index(name)
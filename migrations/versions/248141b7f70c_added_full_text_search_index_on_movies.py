@@ -0,0 +1,75 @@
+"""Added full-text search index on movies
+
+Revision ID: 248141b7f70c
+Revises: 5401d8f9635a
+Create Date: 2026-10-18 09:12:40.512208
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '248141b7f70c'
+down_revision = '5401d8f9635a'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+
+    if dialect == 'postgresql':
+        # Weighted so title matches outrank director matches, which outrank
+        # matches in the synopsis.
+        op.add_column('movies', sa.Column(
+            'search_vector',
+            postgresql.TSVECTOR(),
+            sa.Computed(
+                "setweight(to_tsvector('english', coalesce(name, '')), 'A') || "
+                "setweight(to_tsvector('english', coalesce(director, '')), 'B') || "
+                "setweight(to_tsvector('english', coalesce(description, '')), 'C')",
+                persisted=True,
+            ),
+        ))
+        op.create_index('ix_movies_search_vector', 'movies', ['search_vector'], unique=False, postgresql_using='gin')
+
+    elif dialect == 'sqlite':
+        # External-content FTS5 table kept in sync with movies by triggers.
+        op.execute(
+            "CREATE VIRTUAL TABLE movies_fts USING fts5("
+            "name, director, description, content='movies', content_rowid='id')"
+        )
+        op.execute(
+            "CREATE TRIGGER movies_fts_ai AFTER INSERT ON movies BEGIN "
+            "INSERT INTO movies_fts(rowid, name, director, description) "
+            "VALUES (new.id, new.name, new.director, new.description); END"
+        )
+        op.execute(
+            "CREATE TRIGGER movies_fts_ad AFTER DELETE ON movies BEGIN "
+            "INSERT INTO movies_fts(movies_fts, rowid, name, director, description) "
+            "VALUES ('delete', old.id, old.name, old.director, old.description); END"
+        )
+        op.execute(
+            "CREATE TRIGGER movies_fts_au AFTER UPDATE ON movies BEGIN "
+            "INSERT INTO movies_fts(movies_fts, rowid, name, director, description) "
+            "VALUES ('delete', old.id, old.name, old.director, old.description); "
+            "INSERT INTO movies_fts(rowid, name, director, description) "
+            "VALUES (new.id, new.name, new.director, new.description); END"
+        )
+        op.execute("INSERT INTO movies_fts(movies_fts) VALUES ('rebuild')")
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+
+    if dialect == 'postgresql':
+        op.drop_index('ix_movies_search_vector', table_name='movies')
+        op.drop_column('movies', 'search_vector')
+
+    elif dialect == 'sqlite':
+        op.execute("DROP TRIGGER IF EXISTS movies_fts_au")
+        op.execute("DROP TRIGGER IF EXISTS movies_fts_ad")
+        op.execute("DROP TRIGGER IF EXISTS movies_fts_ai")
+        op.execute("DROP TABLE IF EXISTS movies_fts")
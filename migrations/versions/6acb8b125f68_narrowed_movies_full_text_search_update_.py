@@ -0,0 +1,40 @@
+"""Narrowed movies full-text search update trigger
+
+Revision ID: 6acb8b125f68
+Revises: 09caaa0dc891
+Create Date: 2026-10-18 15:02:47.318204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6acb8b125f68'
+down_revision = '09caaa0dc891'
+branch_labels = None
+depends_on = None
+
+
+# Rating aggregates are written to movies on every review change; only edits
+# to the indexed columns should rewrite the movie's FTS row.
+TRIGGER = (
+    "CREATE TRIGGER movies_fts_au AFTER UPDATE{columns} ON movies BEGIN "
+    "INSERT INTO movies_fts(movies_fts, rowid, name, director, description) "
+    "VALUES ('delete', old.id, old.name, old.director, old.description); "
+    "INSERT INTO movies_fts(rowid, name, director, description) "
+    "VALUES (new.id, new.name, new.director, new.description); END"
+)
+
+
+def upgrade():
+    # Postgres keeps search_vector as a generated column, no trigger there.
+    if op.get_context().dialect.name == 'sqlite':
+        op.execute("DROP TRIGGER IF EXISTS movies_fts_au")
+        op.execute(TRIGGER.format(columns=" OF name, director, description"))
+
+
+def downgrade():
+    if op.get_context().dialect.name == 'sqlite':
+        op.execute("DROP TRIGGER IF EXISTS movies_fts_au")
+        op.execute(TRIGGER.format(columns=""))